@@ -12,6 +12,7 @@ As funções públicas principais são:
 Comentários e mensagens de log estão em português.
 """
 
+import functools
 import os
 from pathlib import Path
 from ..system.helpers import merge_env_items, read_env_file
@@ -94,8 +95,7 @@ def load_settings() -> dict:
 
     thresholds = {k: v.copy() for k, v in DEFAULT_THRESHOLDS.items()}
 
-    project_root = Path(__file__).resolve().parents[2]
-    env_path = Path(os.getenv("MONITORING_ENV_FILE", project_root / ".env"))
+    env_path = _env_file_path()
 
     # Copilot
     # Mescla .env com variáveis de ambiente do processo
@@ -123,6 +123,27 @@ def load_settings() -> dict:
     }
 
 
+def _env_file_path() -> Path:
+    """Retorna o caminho do arquivo `.env` considerado por ``load_settings``."""
+    project_root = Path(__file__).resolve().parents[2]
+    return Path(os.getenv("MONITORING_ENV_FILE", project_root / ".env"))
+
+
+def settings_cache_key() -> tuple:
+    """Chave barata que muda sempre que o resultado de ``load_settings`` pode mudar.
+
+    Combina o caminho e o ``st_mtime_ns`` do `.env` com as variáveis
+    ``MONITORING_*`` do processo; permite memoizar o parsing sem reler o arquivo.
+    """
+    env_path = _env_file_path()
+    try:
+        mtime_ns = os.stat(env_path).st_mtime_ns
+    except OSError:
+        mtime_ns = 0
+    env = tuple(sorted((k, v) for k, v in os.environ.items() if k.startswith("MONITORING_")))
+    return (str(env_path), mtime_ns, env)
+
+
 # Funções auxiliares para aplicar overrides a partir do ambiente
 def _apply_threshold_overrides(env_items: dict, thresholds: dict, logger) -> None:
     """Aplica overrides de thresholds a partir de ``env_items``.
@@ -273,8 +294,23 @@ def validate_settings(settings: dict) -> dict:
 def get_valid_thresholds(settings: dict | None = None) -> dict:
     """Retorna thresholds validados a partir das configurações.
 
+    Sem ``settings`` explícito o resultado é memoizado pela
+    ``settings_cache_key()`` (reparse só quando `.env`/ambiente mudam); cada
+    chamada recebe uma cópia, pois os chamadores ajustam limites in-place.
     Em caso de erro, retorna os thresholds padrão e registra aviso.
     """
+    if settings is None:
+        cached = _cached_valid_thresholds(settings_cache_key())
+        return {k: dict(v) if isinstance(v, dict) else v for k, v in cached.items()}
+    return _validate_thresholds(settings)
+
+
+@functools.lru_cache(maxsize=1)
+def _cached_valid_thresholds(_key: tuple) -> dict:
+    return _validate_thresholds(None)
+
+
+def _validate_thresholds(settings: dict | None) -> dict:
     import logging
 
     logger = logging.getLogger(__name__)
@@ -4,7 +4,12 @@ Loop principal, emissão de snapshots e execução de rotinas de manutenção
 (rotação, compressão e limpeza).
 """
 
+import atexit
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Lock
 
 from .emitter import emit_snapshot as _emit_snapshot
 
@@ -14,9 +19,49 @@ from ..monitoring.state import SystemState
 from ..config.settings import get_valid_thresholds
 from ..monitoring.metrics import collect_metrics as _collect_metrics
 from ..monitoring.averages import ensure_last_ts_exists
+from ..monitoring.handlers import attempt_treatment, network_learning_handler
 
 _NO_DATA_STR = "Sem dados"
 
+# Pool pequeno e preguiçoso para tratamentos concorrentes (I/O e subprocessos)
+_TREATMENT_POOL: ThreadPoolExecutor | None = None
+_TREATMENT_POOL_LOCK = Lock()
+
+
+def _get_treatment_pool() -> ThreadPoolExecutor:
+    """Crie o pool de tratamentos no primeiro uso e reaproveite-o."""
+    global _TREATMENT_POOL
+    with _TREATMENT_POOL_LOCK:
+        if _TREATMENT_POOL is None:
+            _TREATMENT_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 2), thread_name_prefix="treat")
+            atexit.register(_TREATMENT_POOL.shutdown, wait=False)
+        return _TREATMENT_POOL
+
+
+def _dispatch_treatments(state, critical: list, thresholds: dict) -> None:
+    """Despache `attempt_treatment` para cada alerta crítico.
+
+    Um único alerta roda inline; vários rodam em paralelo no pool, com espera
+    limitada a metade da janela de sustentação para não travar o ciclo.
+    """
+    jobs = []
+    for alert in critical:
+        metric_name = alert.get("name")
+        crit = (thresholds.get(metric_name) or {}).get("critical")
+        # Detalhes podem ser extendidos conforme necessário
+        jobs.append((metric_name, {"value": alert.get("value"), "threshold": crit}))
+    if len(jobs) == 1:
+        attempt_treatment(state, *jobs[0])
+        return
+    pool = _get_treatment_pool()
+    futures = [pool.submit(attempt_treatment, state, name, details) for name, details in jobs]
+    done, _pending = wait(futures, timeout=float(getattr(state, "sustained_crit_seconds", 300)) / 2)
+    for fut in done:
+        exc = fut.exception()
+        if exc is not None:
+            logging.getLogger(__name__).debug("tratamento falhou: %s", exc, exc_info=exc)
+
+
 # Helpers de manutenção estão em `src.system.maintenance` (importados acima).
 
 
@@ -39,8 +84,6 @@ def run_loop(interval: float, cycles: int, verbose_level: int) -> None:
         cycles: número de ciclos a executar (0 = infinito).
         verbose_level: controla o nível de saída humana (0 = silencioso).
     """
-    import time
-
     thresholds = get_valid_thresholds()
     state = SystemState(thresholds)
     # Obs: o parser de argumentos (`src.core.args.parse_args`) já aplica overrides
@@ -106,8 +149,6 @@ def _collect_and_emit(state: SystemState, verbose_level: int) -> dict:
 
         # Aprendizagem diária do consumo de rede: registra bytes enviados/recebidos todo ciclo
         try:
-            from src.monitoring.handlers import network_learning_handler
-
             bytes_sent = metrics.get("bytes_sent")
             bytes_recv = metrics.get("bytes_recv")
             if bytes_sent is not None and bytes_recv is not None:
@@ -119,21 +160,15 @@ def _collect_and_emit(state: SystemState, verbose_level: int) -> dict:
                 except (ValueError, TypeError):
                     pass
         except Exception as exc:
-            import logging
-
             logging.getLogger(__name__).debug("Falha ao registrar aprendizagem diária de rede: %s", exc, exc_info=True)
 
     state_name = state.evaluate_metrics(metrics)
     # Após avaliar métricas, verificar e tentar tratamento para cada métrica crítica
-    from src.monitoring.handlers import attempt_treatment
-
+    # Reaproveita os alertas críticos filtrados em evaluate_metrics (sem nova varredura)
     thresholds = getattr(state, "thresholds", {})
-    for metric_name, limits in thresholds.items():
-        crit = limits.get("critical")
-        value = metrics.get(metric_name)
-        if crit is not None and value is not None and value >= crit:
-            # Detalhes podem ser extendidos conforme necessário
-            attempt_treatment(state, metric_name, {"value": value, "threshold": crit})
+    critical = getattr(state, "critical_alerts", ())
+    if critical and len(critical) >= getattr(state, "min_critical_alerts", 1):
+        _dispatch_treatments(state, critical, thresholds)
     result = {"state": state_name, "metrics": metrics}
     snapshot = getattr(state, "current_snapshot", None)
     _emit_snapshot(snapshot if isinstance(snapshot, dict) else None, result, verbose_level)
@@ -20,7 +20,8 @@ import json
 import datetime
 import logging
 from .formatters import _build_long_from_metrics, _fmt_bytes_human, format_used_files_lines, format_duration
-from .state import compute_metric_states
+from .state import _STATE_FIELD_ITEMS, compute_metric_states_batch
+from ..system.log_helpers import json_loads
 from ..system.logs import write_log
 from ..system.time_helpers import extract_epoch
 
@@ -48,7 +49,7 @@ def _iter_jsonl_file(path: Path) -> Iterator[tuple[dict, Path, int]]:
                 if not ln:
                     continue
                 try:
-                    obj = json.loads(ln)
+                    obj = json_loads(ln)
                 except json.JSONDecodeError:
                     # ignore malformed JSON lines
                     continue
@@ -101,8 +102,14 @@ def _compute_averages_and_counts(window: List[tuple], metric_keys: List[str]):
     counts_by_state_per_metric: Dict[str, Dict[str, int]] = {k: {} for k in metric_keys}
     state_counts: Dict[str, int] = {}
 
-    for o, _ts, _p, _ln in window:
-        _process_window_item(o, metric_keys, sums, counts, counts_by_state_per_metric, state_counts)
+    # Estados individuais calculados em lote (limites resolvidos uma vez por janela)
+    rels = [extract_relevant(o) for o, _ts, _p, _ln in window]
+    # manter compatibilidade; pode ser atualizado para passar thresholds reais
+    thresholds = {}  # type: Dict[str, Dict[str, Any]]
+    all_states = compute_metric_states_batch([{k: rel.get(k) for k in metric_keys} for rel in rels], thresholds)
+
+    for rel, metric_states in zip(rels, all_states):
+        _process_window_item(rel, metric_states, metric_keys, sums, counts, counts_by_state_per_metric, state_counts)
 
     averages: Dict[str, Optional[float]] = {}
     for k in metric_keys:
@@ -115,8 +122,13 @@ def _compute_averages_and_counts(window: List[tuple], metric_keys: List[str]):
     return averages, counts, counts_by_state_per_metric, state_counts
 
 
+# Mapeamento de métrica para campo de estado individual (consistente com state.py)
+_STATE_FIELD_MAP = dict(_STATE_FIELD_ITEMS)
+
+
 def _process_window_item(
-    o: dict,
+    rel: dict,
+    metric_states: dict,
     metric_keys: List[str],
     sums: Dict[str, float],
     counts: Dict[str, int],
@@ -125,30 +137,13 @@ def _process_window_item(
 ) -> None:
     """Process a single window item and update aggregates in-place.
 
-    Extracted to reduce complexity of the aggregator while preserving logic.
+    `rel` é o resultado de `extract_relevant` e `metric_states` os estados por
+    métrica já calculados para o item (ver `_compute_averages_and_counts`).
     """
-    rel = extract_relevant(o)
     st_global = _normalize_state(rel.get("state"))
     if st_global is not None:
         state_counts[st_global] = state_counts.get(st_global, 0) + 1
 
-    # Use compute_metric_states (centralizado em state.py) para obter estados individuais
-    metrics_for_state = {k: rel.get(k) for k in metric_keys}
-    # manter compatibilidade; pode ser atualizado para passar thresholds reais
-    thresholds = {}  # type: Dict[str, Dict[str, Any]]
-    metric_states = compute_metric_states(metrics_for_state, thresholds)
-
-    # Mapeamento de métrica para campo de estado individual (consistente com state.py)
-    state_field_map = {
-        "cpu_percent": "state_cpu",
-        "memory_used_bytes": "state_ram",
-        "disk_used_bytes": "state_disk",
-        "ping_ms": "state_ping",
-        "latency_ms": "state_latency",
-        "bytes_sent": "state_bytes_sent",
-        "bytes_recv": "state_bytes_recv",
-    }
-
     for k in metric_keys:
         v = rel.get(k)
         if v is None:
@@ -161,7 +156,7 @@ def _process_window_item(
         counts[k] = (counts.get(k, 0) or 0) + 1
         # Estado individual da métrica, se existir
         st_metric = None
-        state_field = state_field_map.get(k)
+        state_field = _STATE_FIELD_MAP.get(k)
         if state_field and metric_states.get(state_field):
             st_metric = _normalize_state(metric_states.get(state_field))
         else:
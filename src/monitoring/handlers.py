@@ -4,6 +4,8 @@ Seleção de ação e execução controlada (cooldowns, janelas de sustentação
 para correções automáticas. Comentários e logs em português.
 """
 
+import os
+import threading
 import time
 import logging
 from typing import Any
@@ -17,6 +19,20 @@ network_learning_handler = NetworkUsageLearningHandler()
 
 logger = logging.getLogger(__name__)
 
+# Um lock por ação: tratamentos de métricas diferentes podem rodar em paralelo,
+# mas a mesma ação nunca roda duas vezes ao mesmo tempo (cooldown consistente).
+_ACTION_LOCKS: dict[str, threading.Lock] = {}
+_ACTION_LOCKS_GUARD = threading.Lock()
+
+
+def _action_lock(action_name: str) -> threading.Lock:
+    """Retorne o lock associado a `action_name`, criando-o no primeiro uso."""
+    with _ACTION_LOCKS_GUARD:
+        lock = _ACTION_LOCKS.get(action_name)
+        if lock is None:
+            lock = _ACTION_LOCKS[action_name] = threading.Lock()
+        return lock
+
 
 # 0. Seleção de ação
 
@@ -33,8 +49,6 @@ def _select_action(metric_lower: str) -> tuple[str | None, tuple]:
     if "disk" in metric_lower or "disk_percent" in metric_lower:
         return "check_disk_usage", ()
     if "memory" in metric_lower or "ram" in metric_lower or "memory_percent" in metric_lower:
-        import os
-
         if os.name == "posix":
             return "trim_process_working_set_posix", ()
         else:
@@ -179,10 +193,13 @@ def attempt_treatment(state: Any, name: str, _details: dict) -> dict | bool:
             except Exception as exc:
                 logger.debug("network_learning_handler.record_daily_usage falhou: %s", exc, exc_info=True)
 
-    if _on_cooldown(state, action_name, now):
+    lock = _action_lock(action_name)
+    if not lock.acquire(blocking=False):
+        # mesma ação já em execução por outra métrica
         return False
-
     try:
+        if _on_cooldown(state, action_name, now):
+            return False
         if action_func is None:
             return False
         result = _run_main_action(state, action_name, action_func, action_args)
@@ -194,3 +211,5 @@ def attempt_treatment(state: Any, name: str, _details: dict) -> dict | bool:
         return {"action": action_name, "result": result}
     except (OSError, RuntimeError, ValueError, TypeError, AttributeError):
         return False
+    finally:
+        lock.release()
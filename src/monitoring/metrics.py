@@ -22,6 +22,11 @@ from ..system.helpers import validate_host_port, _disk_candidate_paths
 
 logger = logging.getLogger(__name__)
 
+# Regexes compiladas uma única vez (usadas a cada coleta de latência/temperatura)
+_FIRST_FLOAT_RE = re.compile(r"([-+]?\d*\.?\d+)")
+# Procura o padrão `= <num> ms` comum em muitas implementações de ping
+_PING_MS_RE = re.compile(r"=\s*([\d.]+)\s*ms")
+
 # Flag indicando se a última medição de latency foi uma estimativa de timeout
 _last_latency_estimated: bool = False
 # Flag para evitar expor o 0% inicial do psutil na primeira coleta
@@ -407,7 +412,7 @@ def _parse_first_float_from_text(text: str) -> float | None:
     """
     if not text:
         return None
-    m = re.search(r"([-+]?\d*\.?\d+)", text)
+    m = _FIRST_FLOAT_RE.search(text)
     if not m:
         return None
     try:
@@ -459,32 +464,6 @@ def get_network_latency(host: str = "8.8.8.8", port: int = 53, timeout: float =
         logger.debug("validate_host_port failed for %s:%s, falling back to localhost", host, port)
         host = "127.0.0.1"
 
-    def _build_ping_cmd(host: str, timeout: float) -> list[str]:
-        """Monte o comando de ping apropriado para a plataforma.
-
-        Usa timeouts em ms no Windows e em segundos na maioria dos Unix.
-        """
-        system = platform.system().lower()
-        if system.startswith("win"):
-            return ["ping", "-n", "1", "-w", str(int(timeout * 1000)), host]
-        # -W frequentemente espera segundos; arredondar para int
-        return ["ping", "-c", "1", "-W", str(int(timeout)), host]
-
-    def _parse_ping_output_for_ms(output: str) -> float | None:
-        """Parseie a saída do ping e retorne o tempo em ms, ou None se não achar.
-
-        A regex procura o padrão `= <num> ms` comum em muitas implementações.
-        """
-        m = re.search(r"=\s*([\d.]+)\s*ms", output)
-        if not m:
-            return None
-        try:
-            v = float(m.group(1))
-            return v if math.isfinite(v) else None
-        except (ValueError, TypeError) as exc:
-            logger.debug("get_network_latency: parse de ping falhou: %s", exc, exc_info=True)
-            return None
-
     # Tenta via ping do sistema
     cmd = _build_ping_cmd(host, timeout)
     try:
@@ -503,6 +482,65 @@ def get_network_latency(host: str = "8.8.8.8", port: int = 53, timeout: float =
     return _tcp_latency_fallback(host, port, timeout)
 
 
+def _build_ping_cmd(host: str, timeout: float) -> list[str]:
+    """Monte o comando de ping apropriado para a plataforma.
+
+    Usa timeouts em ms no Windows e em segundos na maioria dos Unix.
+    """
+    system = platform.system().lower()
+    if system.startswith("win"):
+        return ["ping", "-n", "1", "-w", str(int(timeout * 1000)), host]
+    # -W frequentemente espera segundos; arredondar para int
+    return ["ping", "-c", "1", "-W", str(int(timeout)), host]
+
+
+_PING_NUM_CHARS = frozenset("0123456789.")
+
+
+def _scan_ping_ms(output: str) -> str | None:
+    """Localize `= <num> ms` por varredura de string, sem motor de regex.
+
+    Percorre cada ocorrência de "ms" e anda para trás sobre espaços, dígitos/ponto
+    e espaços até exigir um "=". Retorna o texto numérico ou None.
+    """
+    pos = output.find("ms")
+    while pos != -1:
+        j = pos
+        while j > 0 and output[j - 1].isspace():
+            j -= 1
+        end = j
+        while j > 0 and output[j - 1] in _PING_NUM_CHARS:
+            j -= 1
+        start = j
+        while j > 0 and output[j - 1].isspace():
+            j -= 1
+        if start < end and j > 0 and output[j - 1] == "=":
+            return output[start:end]
+        pos = output.find("ms", pos + 2)
+    return None
+
+
+def _parse_ping_output_for_ms(output: str) -> float | None:
+    """Parseie a saída do ping e retorne o tempo em ms, ou None se não achar.
+
+    Caminho rápido por varredura (`_scan_ping_ms`); a regex pré-compilada
+    `_PING_MS_RE` (padrão `= <num> ms`) fica como reserva.
+    """
+    raw = _scan_ping_ms(output)
+    if raw is None:
+        m = _PING_MS_RE.search(output)
+        if not m:
+            return None
+        raw = m.group(1)
+    try:
+        # `[\d.]+` ainda aceita textos como "1.2.3"; por isso o ValueError
+        v = float(raw)
+        return v if math.isfinite(v) else None
+    except ValueError as exc:
+        logger.debug("get_network_latency: parse de ping falhou: %s", exc, exc_info=True)
+        return None
+
+
 def _tcp_latency_fallback(host: str, port: int, timeout: float) -> float | None:
     """Tentar medir latência via conexão TCP; marca _last_latency_estimated.
 
@@ -7,45 +7,168 @@ estados por métrica e utilitários de persistência para histórico de
 pós-tratamento.
 """
 
+import atexit
+import collections
+import functools
+import hashlib
+import json
+import os
+import sys
 import time
-from datetime import datetime, timezone
-from threading import Thread, Lock
-from typing import Any, Optional
+import queue
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Any, Optional, cast
 import logging
 
-from ..config.settings import load_settings
+from ..config.settings import load_settings, settings_cache_key
+from ..system import log_helpers as _log_helpers
+from ..system import logs as _logs
+from ..system import network_learning as _network_learning
+from ..system.log_helpers import JsonlAppender
 from .formatters import normalize_for_display as _normalize_for_display
 
-# Constantes de estado
-STATE_STABLE = "STABLE"
-STATE_WARNING = "WARNING"
-STATE_CRITICAL = "CRITICAL"
-STATE_POST_TREATMENT = "post_treatment"
+# Constantes de estado (internadas: permitem comparação por identidade)
+STATE_STABLE = sys.intern("STABLE")
+STATE_WARNING = sys.intern("WARNING")
+STATE_CRITICAL = sys.intern("CRITICAL")
+STATE_POST_TREATMENT = sys.intern("post_treatment")
+
+# Lookup de normalização: estados já canônicos mapeiam para a própria constante
+_CANONICAL_STATES = {s: s for s in (STATE_STABLE, STATE_WARNING, STATE_CRITICAL)}
+
+
+def _canonical_state(state: Any) -> Any:
+    """Retorne a constante internada correspondente a `state`.
+
+    Caminho rápido sem alocação quando `state` já é canônico; caso contrário
+    normaliza para maiúsculas (estados desconhecidos são devolvidos assim).
+    """
+    if not isinstance(state, str):
+        return state
+    canon = _CANONICAL_STATES.get(state)
+    if canon is not None:
+        return canon
+    upper = state.upper()
+    return _CANONICAL_STATES.get(upper, upper)
+
 
 # Arquivos usados para persistência de pós-tratamento
 _CACHE_DIRNAME = ".cache"
 _POST_TREATMENT_FILENAME = "post_treatment_history.jsonl"
+# Sempre na raiz do projeto; resolvido uma única vez no import
+_POST_TREATMENT_HISTORY_PATH = Path(__file__).resolve().parents[2] / _CACHE_DIRNAME / _POST_TREATMENT_FILENAME
 
+# Worker único e de longa duração para o pós-tratamento: `_activate_treatment`
+# apenas enfileira o job; a thread é criada no primeiro uso.
+_POST_TREATMENT_JOBS: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+_post_treatment_thread: Optional[Thread] = None
+_post_treatment_thread_lock = Lock()
 
-def _compute_metric_states(metrics: dict, thresholds: dict, ignore_metrics: Optional[list[str]] = None) -> dict:
-    state_field_map = {
-        "cpu_percent": "state_cpu",
-        "memory_used_bytes": "state_ram",
-        "disk_used_bytes": "state_disk",
-        "ping_ms": "state_ping",
-        "latency_ms": "state_latency",
-        "bytes_sent": "state_bytes_sent",
-        "bytes_recv": "state_bytes_recv",
-    }
+
+def _post_treatment_loop() -> None:
+    """Consuma jobs `(fn, metrics)` até receber o sentinela None."""
+    while True:
+        job = _POST_TREATMENT_JOBS.get()
+        if job is None:
+            return
+        fn, metrics = job
+        try:
+            fn(metrics)
+        except Exception as exc:
+            logging.getLogger(__name__).debug("post_treatment job failed: %s", exc, exc_info=True)
+
+
+def _submit_post_treatment(fn, metrics: dict[str, Any]) -> None:
+    """Enfileire `fn(metrics)` no worker de pós-tratamento, iniciando-o se preciso."""
+    global _post_treatment_thread
+    with _post_treatment_thread_lock:
+        if _post_treatment_thread is None or not _post_treatment_thread.is_alive():
+            _post_treatment_thread = Thread(target=_post_treatment_loop, name="post-treat", daemon=True)
+            _post_treatment_thread.start()
+    _POST_TREATMENT_JOBS.put((fn, metrics))
+
+
+atexit.register(_POST_TREATMENT_JOBS.put, None)
+
+# Handle de append mantido aberto para o histórico de pós-tratamento em .cache
+# (ficheiro fora da rotação de logs), em vez de open/close a cada snapshot.
+# O fsync segue LOGS_SYNC_MODE: com `always` é feito a cada N snapshots
+# (MONITORING_FSYNC_EVERY) e ao fechar; com `periodic` (padrão) fica a cargo
+# do `_PeriodicSyncer`; com `never`, só flush.
+try:
+    _POST_TREATMENT_FSYNC_EVERY = int(os.getenv("MONITORING_FSYNC_EVERY", "50"))
+except ValueError:
+    _POST_TREATMENT_FSYNC_EVERY = 50
+_HISTORY_APPENDER = JsonlAppender(fsync_every=_POST_TREATMENT_FSYNC_EVERY)
+atexit.register(_HISTORY_APPENDER.close_all)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_policies(_key: tuple) -> dict:
+    """Carregue `treatment_policies` uma vez por chave de configuração (ver `settings_cache_key`)."""
+    cfg = load_settings() or {}
+    return cfg.get("treatment_policies", {}) or {}
+
+
+_collect_metrics_fn = None
+
+
+def _get_collect_metrics():
+    """Import `collect_metrics` (psutil) only on first use and reuse the reference."""
+    global _collect_metrics_fn
+    if _collect_metrics_fn is None:
+        from .metrics import collect_metrics
+
+        _collect_metrics_fn = collect_metrics
+    return _collect_metrics_fn
+
+
+def _iso_utc(ts: float) -> str:
+    """Format epoch `ts` as ISO 8601 UTC with microseconds, without building a `datetime`."""
+    sec = int(ts)
+    us = round((ts - sec) * 1_000_000)
+    if us >= 1_000_000:
+        sec, us = sec + 1, us - 1_000_000
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(sec))}.{us:06d}+00:00"
+
+
+def _now_iso() -> tuple[float, str]:
+    """Retorne `(time.time(), iso_utc)` calculados a partir do mesmo instante."""
+    now = time.time()
+    return now, _iso_utc(now)
+
+
+# Pares (métrica, campo de estado individual), na ordem dos snapshots
+_STATE_FIELD_ITEMS: tuple[tuple[str, str], ...] = (
+    ("cpu_percent", "state_cpu"),
+    ("memory_used_bytes", "state_ram"),
+    ("disk_used_bytes", "state_disk"),
+    ("ping_ms", "state_ping"),
+    ("latency_ms", "state_latency"),
+    ("bytes_sent", "state_bytes_sent"),
+    ("bytes_recv", "state_bytes_recv"),
+)
+
+
+def _resolve_state_limits(thresholds: dict, ignore_metrics: Optional[list[str]] = None) -> list[tuple]:
+    """Resolva uma vez os limites (métrica, campo, warn, crit) usados na classificação por métrica."""
     ignore_metrics = ignore_metrics or []
-    out: dict = {}
-    for metric, key in state_field_map.items():
+    get_limits = thresholds.get
+    resolved = []
+    for metric, key in _STATE_FIELD_ITEMS:
         if metric in ignore_metrics:
             continue
-        value = (metrics or {}).get(metric)
-        limits = (thresholds or {}).get(metric, {}) or {}
-        warn = limits.get("warning")
-        crit = limits.get("critical")
+        limits = get_limits(metric) or {}
+        resolved.append((metric, key, limits.get("warning"), limits.get("critical")))
+    return resolved
+
+
+def _classify_metric_states(metrics: dict, resolved: list[tuple]) -> dict:
+    out: dict = {}
+    get = metrics.get
+    for metric, key, warn, crit in resolved:
+        value = get(metric)
         try:
             if crit is not None and value is not None and value >= crit:
                 out[key] = STATE_CRITICAL
@@ -58,21 +181,45 @@ def _compute_metric_states(metrics: dict, thresholds: dict, ignore_metrics: Opti
     return out
 
 
+def _compute_metric_states(metrics: dict, thresholds: dict, ignore_metrics: Optional[list[str]] = None) -> dict:
+    return _classify_metric_states(metrics, _resolve_state_limits(thresholds, ignore_metrics))
+
+
+# Métricas a ignorar: informativas, duplicadas ou sem tratamento
+_STATE_IGNORED_METRICS = [
+    "memory_total_bytes",
+    "disk_used_bytes",
+    "disk_total_bytes",
+    "temperature",
+    "latency_ms",
+    "bytes_sent",
+    "bytes_recv",
+]
+
+
 def compute_metric_states(metrics: dict, thresholds: dict) -> dict:
     """Public wrapper for per-metric state calculation, ignorando métricas informativas/duplicadas sem tratamento."""
-    # Métricas a ignorar: informativas, duplicadas ou sem tratamento
-    ignore_metrics = [
-        "memory_total_bytes",
-        "disk_used_bytes",
-        "disk_total_bytes",
-        "temperature",
-        "latency_ms",
-        "bytes_sent",
-        "bytes_recv",
-    ]
     if not metrics and not thresholds:
         return {}
-    return _compute_metric_states(metrics or {}, thresholds or {}, ignore_metrics)
+    return _compute_metric_states(metrics or {}, thresholds or {}, _STATE_IGNORED_METRICS)
+
+
+def compute_metric_states_batch(samples: list[dict], thresholds: dict) -> list[dict]:
+    """Compute per-metric states for several samples sharing the same thresholds.
+
+    Equivale a chamar `compute_metric_states` para cada sample, mas resolve os
+    limites uma única vez por lote (útil em replays de histórico).
+    """
+    thresholds = thresholds or {}
+    resolved = _resolve_state_limits(thresholds, _STATE_IGNORED_METRICS)
+    out: list[dict] = []
+    for metrics in samples:
+        if not metrics:
+            # mesmo contrato de `compute_metric_states` para sample vazio/None
+            out.append(_classify_metric_states({}, resolved) if thresholds else {})
+            continue
+        out.append(_classify_metric_states(metrics, resolved))
+    return out
 
 
 class SystemState:
@@ -97,9 +244,9 @@ class SystemState:
         - post_treatment_wait_seconds: tempo de espera antes do post-treatment.
         """
         self.thresholds = thresholds or {}
+        self._index_thresholds()
         try:
-            cfg = load_settings() or {}
-            policies = cfg.get("treatment_policies", {}) or {}
+            policies = _load_policies(settings_cache_key())
         except Exception:
             policies = {}
 
@@ -107,10 +254,16 @@ class SystemState:
             int(policies.get("sustained_crit_seconds", 5 * 60)) if critical_duration is None else int(critical_duration)
         )
         self.post_treatment_wait_seconds = int(post_treatment_wait_seconds)
+        # Quantidade mínima de métricas críticas simultâneas para despachar tratamentos
+        try:
+            self.min_critical_alerts = int(policies.get("min_critical_alerts", 1))
+        except (TypeError, ValueError):
+            self.min_critical_alerts = 1
 
         self.current_snapshot: Optional[dict[str, Any]] = None
         self.post_treatment_snapshot: Optional[dict[str, Any]] = None
-        self.post_treatment_history: list[dict[str, Any]] = []
+        # Buffer circular: mantém apenas os 10 snapshots mais recentes
+        self.post_treatment_history: collections.deque[dict[str, Any]] = collections.deque(maxlen=10)
 
         self.is_critical_active = False
         self.treatment_active = False
@@ -118,50 +271,156 @@ class SystemState:
         self.last_state = STATE_STABLE
         self.critic_since = {}  # type: dict[str, float]
         self._lock = Lock()
+        self._last_snap_hash: Optional[bytes] = None
+        # Execução síncrona do pós-tratamento (útil em testes); por padrão vai para o worker compartilhado.
+        self._synchronous_post_treatment = bool(os.getenv("MONITORING_SYNC_POST_TREATMENT"))
+        # Tratamentos automáticos: `critic_since` alimenta `attempt_treatment`;
+        # MONITORING_AUTO_TREATMENT=0 mantém-no vazio e desliga as correções.
+        self.auto_treatment = os.getenv("MONITORING_AUTO_TREATMENT", "1").lower() not in ("0", "false", "no", "off")
+        # Visão imutável (current, post, active, last_state) publicada por troca
+        # de referência; `normalize_for_display` lê sem precisar do lock.
+        self._display_view: tuple[dict[str, Any], dict[str, Any], bool, Any] = ({}, {}, False, STATE_STABLE)
+        # Último (métricas, sumários) calculado por `_summaries_for`
+        self._summary_cache: Optional[tuple[dict[str, Any], tuple[Any, Any]]] = None
+        # Última avaliação (vetor de thresholds, cópia das métricas, estado)
+        self._last_eval: Optional[tuple[tuple, dict[str, Any], str, list[dict[str, Any]], list[dict[str, Any]]]] = None
+        # Alertas por métrica da última avaliação ({"name", "value", "level"})
+        # e o subconjunto crítico, filtrado uma vez por avaliação
+        self.last_alerts: list[dict[str, Any]] = []
+        self.critical_alerts: list[dict[str, Any]] = []
+
+    def _publish_display_view(self) -> None:
+        """Republique `_display_view`; chamar com `self._lock` adquirido."""
+        self._display_view = (
+            self.current_snapshot or {},
+            self.post_treatment_snapshot or {},
+            bool(self.treatment_active),
+            self.last_state,
+        )
 
     def evaluate_metrics(self, metrics: dict[str, Any]) -> str:
         """Avalie `metrics` contra thresholds e atualize snapshots internos.
 
         Retorna a string de estado calculada (ex.: 'STABLE', 'WARNING', 'CRITICAL').
         """
-        # Atualiza thresholds dinâmicos de rede com valor aprendido
-        try:
-            from src.system.network_learning import NetworkUsageLearningHandler
-
-            learning = NetworkUsageLearningHandler()
-            limit = learning.get_current_limit()
-            if "bytes_sent" in self.thresholds:
-                self.thresholds["bytes_sent"]["critical"] = limit
-            if "bytes_recv" in self.thresholds:
-                self.thresholds["bytes_recv"]["critical"] = limit
-        except Exception as exc:
-            logging.warning(f"Falha ao definir limite crítico: {exc}")
-        state = self._evaluate_against_thresholds(metrics or {})
-        self._update_snapshots(state, metrics or {})
+        metrics = metrics or {}
+        # Atualiza thresholds dinâmicos de rede com valor aprendido (só se
+        # houver threshold de rede a ajustar; evita ler o cache de aprendizado)
+        if "bytes_sent" in self.thresholds or "bytes_recv" in self.thresholds:
+            try:
+                learning = _network_learning.NetworkUsageLearningHandler()
+                limit = learning.get_current_limit()
+                changed = False
+                for name in ("bytes_sent", "bytes_recv"):
+                    if name in self.thresholds and self.thresholds[name].get("critical") != limit:
+                        self.thresholds[name]["critical"] = limit
+                        changed = True
+                # Reindexa só quando o limite aprendido muda (raro): mantém o
+                # vetor estável e permite reaproveitar a última avaliação.
+                if changed:
+                    self._index_thresholds()
+            except Exception as exc:
+                logging.warning(f"Falha ao definir limite crítico: {exc}")
+        last = self._last_eval
+        if last is not None and last[0] is self._threshold_vec and last[1] == metrics:
+            state, alerts, critical = last[2], last[3], last[4]
+        else:
+            # Estado e alertas na mesma passada; `critical_alerts` é reaproveitado
+            # pelo loop principal para despachar tratamentos.
+            state, alerts = self._scan_thresholds(metrics)
+            critical = [a for a in alerts if a["level"] is STATE_CRITICAL]
+            self._last_eval = (self._threshold_vec, dict(metrics), state, alerts, critical)
+        self.last_alerts = alerts
+        self.critical_alerts = critical
+        if self.auto_treatment:
+            self._track_critic_since(critical)
+        self._update_snapshots(state, metrics)
         return state
 
-    def _evaluate_against_thresholds(self, metrics: dict[str, Any]) -> str:
-        for name, value in (metrics or {}).items():
-            limits = (self.thresholds or {}).get(name, {}) or {}
-            warn = limits.get("warning")
+    def _track_critic_since(self, critical: list[dict[str, Any]]) -> None:
+        """Atualize `critic_since` (início monotônico por métrica crítica) numa única passada."""
+        since = self.critic_since
+        if not critical:
+            since.clear()
+            return
+        now = time.monotonic()
+        names = set()
+        for alert in critical:
+            name = alert["name"]
+            names.add(name)
+            since.setdefault(name, now)
+        for name in [n for n in since if n not in names]:
+            del since[name]
+
+    def set_thresholds(self, thresholds: dict[str, Any]) -> None:
+        """Substitua os thresholds e reconstrua o vetor de limites pré-indexado."""
+        self.thresholds = thresholds or {}
+        self._index_thresholds()
+
+    def _index_thresholds(self) -> None:
+        """Pré-indexa os limites como tuplas `(nome, warning, critical)`.
+
+        Limites ausentes ou não numéricos viram None aqui (e métricas sem
+        nenhum limite numérico são descartadas), para que os loops de
+        avaliação façam apenas desempacotamento de tupla e comparações.
+        """
+
+        def _num(val: Any) -> Optional[float]:
+            return val if isinstance(val, (int, float)) and not isinstance(val, bool) else None
+
+        vec: list[tuple[str, Optional[float], Optional[float]]] = []
+        for name, limits in self.thresholds.items():
+            if not isinstance(limits, dict):
+                continue
             crit = limits.get("critical")
+            if crit is None:
+                crit = limits.get("critic")
+            warn, crit = _num(limits.get("warning")), _num(crit)
+            if warn is not None or crit is not None:
+                vec.append((name, warn, crit))
+        # Tupla imutável: iteração um pouco mais barata e sem risco de mutação externa
+        self._threshold_vec: tuple[tuple[str, Optional[float], Optional[float]], ...] = tuple(vec)
+
+    def _evaluate_against_thresholds(self, metrics: dict[str, Any]) -> str:
+        if not self._threshold_vec:
+            return STATE_STABLE
+        return self._scan_thresholds(metrics)[0]
+
+    def _scan_thresholds(self, metrics: dict[str, Any]) -> tuple[str, list[dict[str, Any]]]:
+        """Uma única passada pelo vetor de limites: estado global e alertas por métrica.
+
+        Valores não comparáveis com o limite são ignorados.
+        """
+        alerts: list[dict[str, Any]] = []
+        state = STATE_STABLE
+        get = metrics.get
+        for name, warn, crit in self._threshold_vec:
+            v = get(name)
+            if v is None:
+                continue
             try:
-                if crit is not None and value is not None and value >= crit:
-                    return STATE_CRITICAL
-                if warn is not None and value is not None and value >= warn:
-                    return STATE_WARNING
+                if crit is not None and v >= crit:
+                    alerts.append({"name": name, "value": v, "level": STATE_CRITICAL})
+                    state = STATE_CRITICAL
+                elif warn is not None and v >= warn:
+                    alerts.append({"name": name, "value": v, "level": STATE_WARNING})
+                    if state is STATE_STABLE:
+                        state = STATE_WARNING
             except TypeError:
                 continue
-        return STATE_STABLE
+        return state, alerts
 
     def _update_snapshots(self, state: str, metrics: dict[str, Any]):
-        now = time.time()
-        state_norm = (state or "").upper() if isinstance(state, str) else state
-        snap = self._build_snapshot(state_norm, metrics)
+        now, ts_iso = _now_iso()
+        state_norm = _canonical_state(state)
+        snap = self._build_snapshot(state_norm, metrics, ts_iso=ts_iso)
+        # Atribuições de referência única são atômicas no CPython: ficam fora
+        # do lock, que protege apenas a máquina de estados crítico/tratamento.
+        self.current_snapshot = snap
+        self.last_state = state_norm
         to_activate = False
         with self._lock:
-            self.current_snapshot = snap
-            if isinstance(state_norm, str) and state_norm == STATE_CRITICAL:
+            if state_norm is STATE_CRITICAL:
                 if not self.is_critical_active:
                     self.is_critical_active = True
                     self.critical_start_time = now
@@ -171,69 +430,77 @@ class SystemState:
                 self.is_critical_active = False
                 self.treatment_active = False
                 self.post_treatment_snapshot = None
-            self.last_state = state_norm
+            self._publish_display_view()
 
         if to_activate:
             self._activate_treatment(metrics)
 
-    def _build_snapshot(self, state: str, metrics: dict[str, Any]) -> dict[str, Any]:
-        snap = {"state": state, "timestamp": datetime.now(timezone.utc).isoformat(), "metrics": metrics}
+    def _build_snapshot(
+        self, state: str, metrics: dict[str, Any], *, with_summary: bool = True, ts_iso: Optional[str] = None
+    ) -> dict[str, Any]:
+        ts = ts_iso if ts_iso is not None else _now_iso()[1]
+        if not with_summary:
+            return {"state": state, "timestamp": ts, "metrics": metrics}
+        # O formato do snapshot é fixo: montamos o dict completo num único
+        # literal em vez de inserir os sumários depois (evita redimensionar).
         try:
-            from typing import cast
-
-            nf = _normalize_for_display(metrics if isinstance(metrics, dict) else {})
-            snap["summary_short"] = cast(Any, nf.get("summary_short"))
-            snap["summary_long"] = cast(Any, nf.get("summary_long"))
+            summary_short, summary_long = self._summaries_for(metrics if isinstance(metrics, dict) else {})
+            return {
+                "state": state,
+                "timestamp": ts,
+                "metrics": metrics,
+                "summary_short": summary_short,
+                "summary_long": summary_long,
+            }
         except Exception:  # nosec B110
             try:
-                import logging as _logging
-
-                _logging.exception("formatters error in _build_snapshot")
+                logging.exception("formatters error in _build_snapshot")
             except Exception:  # nosec B110
                 pass
-        return snap
+        return {"state": state, "timestamp": ts, "metrics": metrics}
+
+    def _summaries_for(self, metrics: dict[str, Any]) -> tuple[Any, Any]:
+        """Retorne `(summary_short, summary_long)`, reaproveitando o último resultado.
+
+        Se as métricas forem iguais às da chamada anterior (comparação de dict
+        em C), o formatter não é executado de novo. Guarda uma cópia rasa para
+        que mutações do chamador não invalidem o cache silenciosamente.
+        """
+        cached = self._summary_cache
+        if cached is not None and cached[0] == metrics:
+            return cached[1]
+        nf = _normalize_for_display(metrics)
+        summaries = (cast(Any, nf.get("summary_short")), cast(Any, nf.get("summary_long")))
+        self._summary_cache = (dict(metrics), summaries)
+        return summaries
 
     def _compute_alerts(self, metrics: dict[str, Any]) -> list[dict[str, Any]]:
-        alerts: list[dict[str, Any]] = []
-        try:
-            for name, limits in (self.thresholds or {}).items():
-                val = metrics.get(name) if isinstance(metrics, dict) else None
-                if val is None:
-                    continue
-                alert = self._classify_metric(name, limits, val)
-                if alert:
-                    alerts.append(alert)
-        except (TypeError, KeyError, ValueError):
-            return []
-        return alerts
+        """Retorne os alertas por métrica de `metrics` (ver `_scan_thresholds`).
 
-    def _classify_metric(self, name: str, limits: dict[str, Any], val: Any) -> Optional[dict[str, Any]]:
-        warn = limits.get("warning")
-        crit = limits.get("critical")
-        try:
-            if crit is not None and val >= crit:
-                return {"name": name, "value": val, "level": STATE_CRITICAL}
-            if warn is not None and val >= warn:
-                return {"name": name, "value": val, "level": STATE_WARNING}
-        except TypeError:
-            return None
-        return None
+        Reaproveita a lista calculada por `evaluate_metrics` quando as métricas
+        e os limites são os mesmos da última avaliação.
+        """
+        if not isinstance(metrics, dict):
+            return []
+        last = self._last_eval
+        if last is not None and last[0] is self._threshold_vec and last[1] == metrics:
+            return last[3]
+        return self._scan_thresholds(metrics)[1]
 
     def _prepare_post_treatment_snapshot(
         self, metrics_after: dict[str, Any], alerts_after: list[dict[str, Any]]
     ) -> dict[str, Any]:
         """Prepare a normalized post-treatment snapshot (best-effort)."""
+        ts_iso = _now_iso()[1]
         try:
-            snap = self._build_snapshot(STATE_POST_TREATMENT, metrics_after)
+            snap = self._build_snapshot(STATE_POST_TREATMENT, metrics_after, with_summary=False, ts_iso=ts_iso)
             snap["alerts"] = alerts_after
-            snap.pop("summary_short", None)
-            snap.pop("summary_long", None)
             snap["post_treatment"] = True
             return snap
         except Exception:
             return {
                 "state": STATE_POST_TREATMENT,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": ts_iso,
                 "metrics": metrics_after,
                 "alerts": alerts_after,
                 "post_treatment": True,
@@ -250,45 +517,53 @@ class SystemState:
             except Exception as _exc:
                 logging.getLogger(__name__).debug("post_treatment write fallback failed: %s", _exc)
 
+    @staticmethod
+    def _snapshot_content_hash(snap: dict[str, Any]) -> Optional[bytes]:
+        """Return a short content digest of `snap` without its timestamp, or None if not hashable."""
+        try:
+            content = {k: v for k, v in snap.items() if k != "timestamp"}
+            payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            return None
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).digest()
+
     def _write_post_treatment_primary(self, snap: dict[str, Any]) -> None:
         """Primary path: use .cache in project root and helper write_json."""
-        from ..system.log_helpers import write_json
-        from pathlib import Path
-        import time as _time
-
-        project_root = Path(__file__).resolve().parents[2]
-        cache_dir = project_root / _CACHE_DIRNAME
-        cache_dir.mkdir(parents=True, exist_ok=True)
-        write_json(cache_dir / _POST_TREATMENT_FILENAME, snap)
+        if not self._append_post_treatment_history(snap):
+            raise OSError("post_treatment history append failed")
 
         # Mantém registro em logs/json/monitoring-*.jsonl normalmente
-        from ..system.logs import get_log_paths
-
-        lp = get_log_paths()
-        entry = {"ts": datetime.now(timezone.utc).isoformat(), "level": "INFO", "msg": "post_treatment"}
-        for k, v in snap.items():
-            if k not in entry:
-                entry[k] = v
-        write_json(lp.json_dir / f"monitoring-{_time.strftime('%Y-%m-%d')}.jsonl", entry)
+        lp = _logs.get_log_paths()
+        # Reaproveita o timestamp do snapshot em vez de consultar o relógio de novo.
+        ts_iso = snap.get("timestamp") if isinstance(snap.get("timestamp"), str) else _now_iso()[1]
+        base = {"ts": ts_iso, "level": "INFO", "msg": "post_treatment"}
+        # `base` primeiro (ordem das chaves no JSONL) e de novo no fim para que
+        # o snapshot nunca sobrescreva ts/level/msg; dict.update copia em C
+        # sem materializar o literal intermediário do desempacotamento.
+        entry = base.copy()
+        entry.update(snap)
+        entry.update(base)
+        _log_helpers.write_json(lp.json_dir / f"monitoring-{time.strftime('%Y-%m-%d')}.jsonl", entry)
 
     def _write_post_treatment_fallback(self, snap: dict[str, Any]) -> None:
         """Fallback path: write only to .cache in project root."""
-        from pathlib import Path
-        import json as _json
+        if not self._append_post_treatment_history(snap):
+            logging.warning("Falha ao gravar snapshot de pós-tratamento em .cache")
 
-        project_root = Path(__file__).resolve().parents[2]
-        cache_dir = project_root / _CACHE_DIRNAME
-        cache_dir.mkdir(parents=True, exist_ok=True)
-        try:
-            from ..system.log_helpers import write_json as _write_json
+    def _append_post_treatment_history(self, snap: dict[str, Any]) -> bool:
+        """Anexe `snap` ao histórico em .cache (appender; `write_text` como reserva).
 
-            _write_json(cache_dir / _POST_TREATMENT_FILENAME, snap)
-        except Exception:
-            try:
-                with (cache_dir / _POST_TREATMENT_FILENAME).open("a", encoding="utf-8") as fh:
-                    fh.write(_json.dumps(snap, ensure_ascii=False) + "\n")
-            except Exception as exc:
-                logging.warning(f"Falha ao gravar snapshot: {exc}")
+        Caminho único usado pelos escritores primário/fallback e pela
+        persistência do histórico. Nunca levanta; retorna se gravou.
+        """
+        try:
+            if _HISTORY_APPENDER.append_json(_POST_TREATMENT_HISTORY_PATH, snap):
+                return True
+            line = json.dumps(snap, ensure_ascii=False, default=str) + "\n"
+            return bool(_log_helpers.write_text(_POST_TREATMENT_HISTORY_PATH, line))
+        except Exception as exc:
+            logging.debug("post_treatment history append raised: %s", exc, exc_info=True)
+            return False
 
     def _post_treatment_worker(self, metrics_snapshot: dict[str, Any]) -> None:
         """Worker logic for post-treatment; kept best-effort and resilient."""
@@ -308,32 +583,42 @@ class SystemState:
 
         except Exception as _exc:
             try:
-                import logging as _logging
-
-                _logging.exception("post_treatment worker unexpected error: %s", _exc)
+                logging.exception("post_treatment worker unexpected error: %s", _exc)
             except Exception as _exc2:
                 logging.getLogger(__name__).debug("failed to log post_treatment worker error: %s", _exc2)
         finally:
             with self._lock:
                 self.treatment_active = False
+                self._publish_display_view()
 
     def _collect_metrics_after(self) -> dict[str, Any]:
         """Attempt to collect metrics after the treatment; always returns a dict."""
         try:
-            from .metrics import collect_metrics as _collect  # type: ignore
-
-            return self._safe_collect(_collect)
+            return self._safe_collect(_get_collect_metrics())
         except Exception:
             return {}
 
     def _record_and_write_snapshot(self, snap: dict[str, Any]) -> None:
-        """Best-effort: record the snapshot in-memory and persist/write artifacts."""
+        """Best-effort: record the snapshot in-memory and persist/write artifacts.
+
+        Snapshots whose content (ignoring the timestamp) matches the previous
+        one are only recorded in memory, so a repeated incident does not
+        rewrite the history and the monitoring JSONL.
+        """
         try:
+            h = self._snapshot_content_hash(snap)
+            with self._lock:
+                duplicate = h is not None and h == self._last_snap_hash
+                self._last_snap_hash = h
+
             try:
                 self._record_post_treatment_snapshot(snap)
             except Exception as _exc:  # best-effort record, log debug
                 logging.getLogger(__name__).debug("_record_post_treatment_snapshot failed: %s", _exc)
 
+            if duplicate:
+                logging.getLogger(__name__).debug("post_treatment snapshot inalterado; escrita ignorada")
+                return
             try:
                 self._write_post_treatment_artifacts(snap)
             except Exception as _exc:
@@ -342,17 +627,22 @@ class SystemState:
             logging.getLogger(__name__).debug("_record_and_write_snapshot unexpected error: %s", _exc_outer)
 
     def _activate_treatment(self, metrics: dict[str, Any]):  # noqa: C901
-        """Public activator: mark treatment active and start worker thread."""
+        """Public activator: mark treatment active and run the worker exactly once.
+
+        Em modo síncrono (`MONITORING_SYNC_POST_TREATMENT`) o worker roda na
+        thread chamadora; caso contrário é enfileirado no worker compartilhado.
+        """
         with self._lock:
             if self.treatment_active:
                 return
             self.treatment_active = True
+            self._publish_display_view()
 
-        thr = Thread(target=self._post_treatment_worker, args=(metrics,), daemon=True)
-        thr.start()
+        if not self._synchronous_post_treatment:
+            _submit_post_treatment(self._post_treatment_worker, metrics)
+            return
 
         try:
-            # also run synchronously for immediate persistence during tests
             self._post_treatment_worker(metrics)
         except Exception as _exc:
             logging.getLogger(__name__).debug("post_treatment worker synchronous run failed: %s", _exc)
@@ -367,44 +657,14 @@ class SystemState:
         try:
             with self._lock:
                 self.post_treatment_history.append(snap)
-                if len(self.post_treatment_history) > 10:
-                    self.post_treatment_history.pop(0)
                 self.post_treatment_snapshot = snap
-            # Persist the snapshot as a best-effort action so external
-            # consumers have a durable copy and static analysis sees
-            # _persist_post_treatment_snapshot being used.
-            try:
-                self._persist_post_treatment_snapshot(snap)
-            except Exception:  # nosec B110
-                # Swallow errors to keep this best-effort and non-fatal.
-                pass
+                self._publish_display_view()
+            # A cópia durável em .cache é gravada por _write_post_treatment_artifacts
         except Exception:  # nosec B110
             self.post_treatment_snapshot = snap
 
     def _persist_post_treatment_snapshot(self, snap: dict[str, Any]) -> None:
-        try:
-            # import get_log_paths removido, não é mais necessário
-            from ..system.log_helpers import write_json  # type: ignore
-
-            # get_log_paths() removido, não é mais necessário
-            # Corrige para sempre criar .cache na raiz do projeto
-            from pathlib import Path
-
-            project_root = Path(__file__).resolve().parents[2]
-            hist_path = project_root / _CACHE_DIRNAME / _POST_TREATMENT_FILENAME
-            hist_path.parent.mkdir(parents=True, exist_ok=True)
-            try:
-                write_json(hist_path, snap)
-            except Exception:
-                try:
-                    from ..system.log_helpers import write_text as _write_text
-                    import json as _json
-
-                    _write_text(hist_path, _json.dumps(snap, ensure_ascii=False) + "\n")
-                except Exception:  # nosec B110
-                    return
-        except Exception:
-            return
+        self._append_post_treatment_history(snap)
 
     def normalize_for_display(self) -> dict[str, Any]:
         """Return a thread-safe, display-ready view of current/post-treatment state.
@@ -415,26 +675,13 @@ class SystemState:
         so external callers and static analysis can observe the canonical
         last evaluated state.
         """
-        with self._lock:
-            current = self.current_snapshot or {}
-            post = self.post_treatment_snapshot or {}
-            active = bool(self.treatment_active)
+        current, post, active, last_state = self._display_view
         # Anotação explícita do dicionário de saída
         out: dict[str, Any] = {"current": current}
         if active and post:
             out["post_treatment"] = post
         # last_state is a lightweight string indicating the most recent
         # evaluated state; include when available.
-        try:
-            if isinstance(self.last_state, str) and self.last_state:
-                out["last_state"] = self.last_state
-        except Exception:  # nosec B110
-            pass
+        if isinstance(last_state, str) and last_state:
+            out["last_state"] = last_state
         return out
-
-
-## Instância global de thresholds lida a partir de configurações
-try:
-    thresholds = (load_settings() or {}).get("thresholds", {})
-except Exception:
-    thresholds = {}
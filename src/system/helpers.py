@@ -1,16 +1,23 @@
+"""Helpers genéricos de sistema.
+
+Contém utilitários pequenos e sem dependências pesadas que são usados por
+vários subsistemas (validação de host/porta, leitura de .env, caminhos de
+disco candidatos, etc.).
+"""
+
 import json
 import datetime
 import logging
+import mmap
 import os
 import socket
+import threading
 from typing import List, Tuple
 from pathlib import Path
 
-"""Helpers genéricos de sistema.
-Contém utilitários pequenos e sem dependências pesadas que são usados por
-vários subsistemas (validação de host/porta, leitura de .env, caminhos de
-disco candidatos, etc.).
-"""
+from .log_helpers import json_loads
+
+logger = logging.getLogger(__name__)
 
 
 def update_network_usage_learning(bytes_sent: int, bytes_recv: int) -> bool:
@@ -28,7 +35,13 @@ def update_network_usage_learning(bytes_sent: int, bytes_recv: int) -> bool:
         return False
 
 
-NETWORK_LEARNING_FILE = Path(".cache/network_usage_learning.json")
+# Histórico append-only: uma linha {"date", "bytes_sent", "bytes_recv"} por
+# amostra; a última linha de cada data prevalece.
+NETWORK_LEARNING_FILE = Path(".cache/network_usage_learning.jsonl")
+# Formato antigo (um único dict JSON reescrito a cada amostra), migrado no primeiro uso
+_LEGACY_NETWORK_LEARNING_FILE = Path(".cache/network_usage_learning.json")
+# Compacta o histórico (uma linha por data) quando passa deste tamanho
+_NETWORK_COMPACT_BYTES = 256 * 1024
 
 
 def ensure_cache_dir_exists():
@@ -41,56 +54,110 @@ NETWORK_DEFAULT_LIMIT = 20 * 1024**3  # 20GB
 NETWORK_MARGIN = 0.2  # 20%
 
 
+def _usage_by_date(entries: list[dict]) -> dict[str, dict]:
+    """Reduza as linhas do histórico a `{data: {"bytes_sent", "bytes_recv"}}` (última vence)."""
+    data: dict[str, dict] = {}
+    for e in entries:
+        date_str = e.get("date") if isinstance(e, dict) else None
+        if date_str:
+            data[date_str] = {"bytes_sent": e.get("bytes_sent", 0), "bytes_recv": e.get("bytes_recv", 0)}
+    return data
+
+
+def _write_usage_atomic(data: dict[str, dict]) -> None:
+    """Regrave o histórico com uma linha por data (tmp + os.replace)."""
+    tmp = NETWORK_LEARNING_FILE.with_name(NETWORK_LEARNING_FILE.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        for date_str, usage in data.items():
+            f.write(json.dumps({"date": date_str, **usage}) + "\n")
+    os.replace(tmp, NETWORK_LEARNING_FILE)
+
+
+def _migrate_legacy_network_usage() -> None:
+    """Converta o `.json` antigo para o histórico JSONL, se ainda não existir."""
+    if NETWORK_LEARNING_FILE.exists() or not _LEGACY_NETWORK_LEARNING_FILE.exists():
+        return
+    try:
+        with _LEGACY_NETWORK_LEARNING_FILE.open("r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        if isinstance(legacy, dict):
+            _write_usage_atomic(legacy)
+    except Exception as exc:
+        logger.debug("Migração do histórico de rede falhou: %s", exc, exc_info=True)
+
+
 def record_network_usage(bytes_sent: int, bytes_recv: int) -> None:
-    """Persist network usage for daily learning of automatic limit."""
+    """Persist network usage for daily learning of automatic limit.
+
+    Cada amostra é uma linha acrescentada ao histórico (O(1) de I/O); quando o
+    arquivo cresce além de `_NETWORK_COMPACT_BYTES` ele é compactado para uma
+    linha por data.
+    """
     today = datetime.date.today().isoformat()
-    data = {}
-    if NETWORK_LEARNING_FILE.exists():
-        try:
-            with NETWORK_LEARNING_FILE.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            data = {}
-    data[today] = {"bytes_sent": bytes_sent, "bytes_recv": bytes_recv}
+    line = json.dumps({"date": today, "bytes_sent": bytes_sent, "bytes_recv": bytes_recv}) + "\n"
     try:
         NETWORK_LEARNING_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with NETWORK_LEARNING_FILE.open("w", encoding="utf-8") as f:
-            json.dump(data, f)
+        _migrate_legacy_network_usage()
+        with NETWORK_LEARNING_FILE.open("a", encoding="utf-8") as f:
+            f.write(line)
+            size = f.tell()
+        if size > _NETWORK_COMPACT_BYTES:
+            _write_usage_atomic(_usage_by_date(read_jsonl(NETWORK_LEARNING_FILE)))
     except Exception as exc:
-        import logging
+        logger.error("Erro ao salvar dados de rede: %s", exc, exc_info=True)
 
-        logging.getLogger(__name__).error("Erro ao salvar dados de rede: %s", exc, exc_info=True)
+
+# Último limite calculado: (caminho, mtime_ns, size, limite)
+_NET_LIMIT_CACHE: tuple[str, int, int, int] | None = None
 
 
 def get_network_limit() -> int:
-    """Retorna o limite atual para bytes_sent/bytes_recv, aprendendo após 4 semanas."""
-    if not NETWORK_LEARNING_FILE.exists():
+    """Retorna o limite atual para bytes_sent/bytes_recv, aprendendo após 4 semanas.
+
+    O resultado é reaproveitado enquanto o arquivo de aprendizado não mudar
+    (mesmo `mtime_ns` e tamanho): em regime, custa apenas um `stat()`.
+    """
+    global _NET_LIMIT_CACHE
+    path = str(NETWORK_LEARNING_FILE)
+    try:
+        st = os.stat(path)
+    except OSError:
+        _NET_LIMIT_CACHE = None
         return NETWORK_DEFAULT_LIMIT
+    cached = _NET_LIMIT_CACHE
+    if cached is not None and cached[:3] == (path, st.st_mtime_ns, st.st_size):
+        return cached[3]
     try:
-        with NETWORK_LEARNING_FILE.open("r", encoding="utf-8") as f:
-            data = json.load(f)
+        # histórico append-only: leitura incremental entre chamadas
+        data = _usage_by_date(read_jsonl(path, cache=True))
+        limit = _network_limit_from_usage(data)
     except Exception:
         return NETWORK_DEFAULT_LIMIT
-    # Agrupa por semana
-    weeks: dict[tuple[int, int], list[int]] = {}
+    _NET_LIMIT_CACHE = (path, st.st_mtime_ns, st.st_size, limit)
+    return limit
+
+
+def _network_limit_from_usage(data: dict) -> int:
+    """Compute the limit from the daily history `{data_iso: {"bytes_sent", "bytes_recv"}}`."""
+    # Uma passada: semanas distintas + soma/contagem (a média é sobre todos os dias)
+    weeks: set[tuple[int, int]] = set()
+    total = 0
     for date_str, usage in data.items():
-        dt = datetime.date.fromisoformat(date_str)
-        year_week = dt.isocalendar()[:2]
-        if year_week not in weeks:
-            weeks[year_week] = []
-        weeks[year_week].append(usage["bytes_sent"] + usage["bytes_recv"])
+        weeks.add(datetime.date.fromisoformat(date_str).isocalendar()[:2])
+        total += usage["bytes_sent"] + usage["bytes_recv"]
     if len(weeks) < NETWORK_LEARNING_WEEKS:
         return NETWORK_DEFAULT_LIMIT
-    # Calcula média semanal
-    all_values = [v for week in weeks.values() for v in week]
-    avg = sum(all_values) / max(1, len(all_values))
+    avg = total / max(1, len(data))
     limit = int(avg * (1 + NETWORK_MARGIN))
     return limit
 
 
 # vulture: ignore
 
-logger = logging.getLogger(__name__)
+# Alguns analisadores estáticos/mypy reclamam do acesso direto a `os.WNOHANG`
+# em plataformas onde a constante pode não existir; resolvemos uma única vez
+# com getattr e fallback para manter o comportamento POSIX.
+_WNOHANG = getattr(os, "WNOHANG", 1)
 
 
 def reap_children_nonblocking() -> List[Tuple[int, int]]:
@@ -102,17 +169,11 @@ def reap_children_nonblocking() -> List[Tuple[int, int]]:
     """
     reaped: List[Tuple[int, int]] = []
     if os.name == "posix":
+        waitpid = os.waitpid
         try:
-            # Alguns analisadores estáticos/mypy reclamam do acesso direto a
-            # `os.WNOHANG` em plataformas onde a constante pode não existir.
-            # Usamos getattr com fallback para manter o comportamento POSIX
-            # e evitar erros de tipagem em outras plataformas.
-            flags = getattr(os, "WNOHANG", 1)
-            while True:
-                pid, status = os.waitpid(-1, flags)
-                if pid == 0:
-                    break
-                reaped.append((pid, status))
+            # pid 0 => há filhos, mas nenhum terminou ainda
+            while (pid_status := waitpid(-1, _WNOHANG))[0]:
+                reaped.append(pid_status)
         except ChildProcessError:
             pass  # nenhum filho
         except OSError:
@@ -120,27 +181,35 @@ def reap_children_nonblocking() -> List[Tuple[int, int]]:
     return reaped
 
 
+def _is_ip_literal(host: str) -> bool:
+    """Retorne True se ``host`` for um literal IPv4 estrito ou IPv6."""
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+            return True
+        except (OSError, ValueError, TypeError):
+            continue
+    return False
+
+
 def validate_host_port(host: str, port: int) -> bool:
     """Valida um par host:port para uso em conexões de rede.
 
-    Retorna True quando ``host`` for um endereço IPv4 válido e a porta estiver
-    no intervalo (1..65535).
+    Retorna True quando ``host`` for um endereço IPv4 (forma estrita, sem
+    abreviações como ``1.2.3``) ou IPv6 válido e a porta for um inteiro no
+    intervalo (1..65535).
     """
-    try:
-        socket.inet_aton(host)
-        return 0 < port < 65536
-    except (OSError, ValueError):
+    if not isinstance(port, int) or not 0 < port < 65536:
         return False
+    return _is_ip_literal(host)
 
 
-def _disk_candidate_paths() -> list[object]:
-    r"""Retorne candidatos para checagem de uso de disco.
+def _build_disk_candidates() -> tuple[object, ...]:
+    r"""Monte os candidatos para checagem de uso de disco.
 
-    A lista gerada tenta usar a âncora do sistema (ex: "C:\\" no Windows),
-    depois o root POSIX e, por fim, o literal '/', como fallback.
+    Tenta usar a âncora do sistema (ex: "C:\\" no Windows), depois o root
+    POSIX e, por fim, o literal '/', como fallback.
     """
-    # Path is already imported at module level
-
     candidates: list[object] = []
     try:
         anchor = Path().anchor
@@ -151,7 +220,20 @@ def _disk_candidate_paths() -> list[object]:
         pass
     candidates.append(Path("/"))
     candidates.append("/")
-    return candidates
+    return tuple(candidates)
+
+
+# Constantes do processo: calculadas uma vez na importação
+_DISK_CANDIDATES = _build_disk_candidates()
+
+
+def _disk_candidate_paths() -> list[object]:
+    """Retorne candidatos para checagem de uso de disco (cópia de `_DISK_CANDIDATES`)."""
+    return list(_DISK_CANDIDATES)
+
+
+# Parse memorizado de `.env`: caminho -> (mtime_ns, size, mapeamento)
+_ENV_CACHE: dict[str, tuple[int, int, dict[str, str]]] = {}
 
 
 def read_env_file(path: Path | str) -> dict:
@@ -162,37 +244,153 @@ def read_env_file(path: Path | str) -> dict:
     - A primeira '=' separa chave/valor; aspas simples ou duplas em torno do
       valor são removidas.
     - Se o ficheiro não existir, retorna um dict vazio.
-    """
-    # Path is already imported at module level
 
+    O parse é reaproveitado enquanto `mtime_ns` e tamanho não mudarem; o
+    dicionário retornado é sempre uma cópia.
+    """
     result: dict[str, str] = {}
-    p = Path(path)
-    if not p.exists():
+    key_path = str(path)
+    try:
+        # EAFP: um único open em vez de exists() + open()
+        fh = open(path, "r", encoding="utf-8", buffering=1 << 16)
+    except OSError:
+        # ficheiro ausente ou ilegível: mapeamento vazio
+        _ENV_CACHE.pop(key_path, None)
         return result
     try:
-        with p.open("r", encoding="utf-8") as fh:
+        with fh:
+            st = os.fstat(fh.fileno())
+            cached = _ENV_CACHE.get(key_path)
+            if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                return dict(cached[2])
             for line in fh:
                 line = line.strip()
-                if not line or line.startswith("#"):
+                if not line or line[0] == "#":
                     continue
-                if "=" not in line:
+                key, sep, val = line.partition("=")
+                if not sep:
                     continue
-                key, val = line.split("=", 1)
-                key = key.strip()
                 # remover espaços e aspas ao redor
                 val = val.strip().strip('"').strip("'")
                 # remover comentários inline após o valor (ex: "7  # default")
                 if "#" in val:
-                    val = val.split("#", 1)[0].rstrip()
-                result[key] = val
+                    val = val.partition("#")[0].rstrip()
+                result[key.strip()] = val
     except OSError:
         # Best-effort: return empty mapping on read errors
         return {}
-    return result
+    _ENV_CACHE[key_path] = (st.st_mtime_ns, st.st_size, result)
+    return dict(result)
+
+
+# Cache de read_jsonl(cache=True): caminho -> {"mtime_ns", "size", "offset",
+# "tail", "entries", "result"}. `offset` aponta para o fim da última linha
+# completa; `tail` guarda os bytes imediatamente antes dele para detectar
+# reescritas do arquivo (que então é relido do início).
+_JSONL_CACHE: dict[str, dict] = {}
+_JSONL_CACHE_LOCK = threading.Lock()
+_JSONL_TAIL_BYTES = 64
+# Acima deste tamanho a leitura sem lock usa mmap + busca de '\n' em C
+_JSONL_MMAP_MIN_BYTES = 128 * 1024
+
+
+def _parse_jsonl_bytes(data: bytes, entries: list) -> None:
+    """Decodifique cada linha não vazia de `data` e acrescente em `entries`."""
+    for raw in data.split(b"\n"):
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            entries.append(json_loads(raw))
+        except Exception as exc:
+            logging.warning(f"Linha JSON inválida ignorada: {exc}")
+
 
+def _read_jsonl_mmap(p: Path) -> list[dict] | None:
+    """Leia `p` via mmap quando for grande; retorna None para usar a leitura por linhas."""
+    try:
+        with p.open("rb") as fh:
+            if os.fstat(fh.fileno()).st_size < _JSONL_MMAP_MIN_BYTES:
+                return None
+            entries: list = []
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = 0
+                size = len(mm)
+                while start < size:
+                    nl = mm.find(b"\n", start)
+                    end = size if nl == -1 else nl
+                    raw = mm[start:end].strip()
+                    start = end + 1
+                    if not raw:
+                        continue
+                    try:
+                        entries.append(json_loads(raw))
+                    except Exception as exc:
+                        logging.warning(f"Linha JSON inválida ignorada: {exc}")
+            return entries
+    except (OSError, ValueError):
+        return None
 
-def read_jsonl(path: Path | str, use_lock: bool = False) -> list[dict]:
-    """Lê um arquivo .jsonl e retorna uma lista de dicts. Usa portalocker se solicitado."""
+
+def _read_jsonl_cached(p: Path, open_binary) -> list[dict]:
+    """Leia `p` reaproveitando o parse anterior; só a cauda nova é decodificada."""
+    key = str(p)
+    try:
+        st = os.stat(p)
+    except OSError:
+        with _JSONL_CACHE_LOCK:
+            _JSONL_CACHE.pop(key, None)
+        return []
+    with _JSONL_CACHE_LOCK:
+        cached = _JSONL_CACHE.get(key)
+    if cached is not None and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+        return list(cached["result"])
+
+    start = 0
+    entries: list = []
+    prev_tail = b""
+    try:
+        with open_binary() as fh:
+            if cached is not None and cached["offset"] <= st.st_size:
+                tail = cached["tail"]
+                fh.seek(cached["offset"] - len(tail))
+                if fh.read(len(tail)) == tail:
+                    # arquivo só cresceu: continuar do fim da última linha completa
+                    start = cached["offset"]
+                    entries = list(cached["entries"])
+                    prev_tail = tail
+            fh.seek(start)
+            data = fh.read()
+    except OSError:
+        return []
+
+    end = data.rfind(b"\n") + 1
+    _parse_jsonl_bytes(data[:end], entries)
+    # Linha final sem '\n' (possivelmente parcial) entra no resultado, mas não
+    # avança o offset: é relida quando o arquivo mudar.
+    result = entries
+    if data[end:].strip():
+        result = list(entries)
+        _parse_jsonl_bytes(data[end:], result)
+    with _JSONL_CACHE_LOCK:
+        _JSONL_CACHE[key] = {
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "offset": start + end,
+            "tail": (prev_tail + data[:end])[-_JSONL_TAIL_BYTES:],
+            "entries": entries,
+            "result": result,
+        }
+    return list(result)
+
+
+def read_jsonl(path: Path | str, use_lock: bool = False, cache: bool = False) -> list[dict]:
+    """Lê um arquivo .jsonl e retorna uma lista de dicts. Usa portalocker se solicitado.
+
+    Com ``cache=True`` o resultado é memorizado por ``(mtime_ns, size)``: sem
+    mudanças não há parse, e se o arquivo apenas cresceu só as linhas novas
+    são decodificadas. A lista retornada é sempre uma cópia.
+    """
     p = Path(path)
     entries = []
     portalocker = None
@@ -204,13 +402,23 @@ def read_jsonl(path: Path | str, use_lock: bool = False) -> list[dict]:
         except ImportError:
             pass
 
+    if cache:
+        if use_lock and portalocker:
+            return _read_jsonl_cached(p, lambda: portalocker.Lock(str(p), "rb"))
+        return _read_jsonl_cached(p, lambda: p.open("rb"))
+
+    if not use_lock:
+        big = _read_jsonl_mmap(p)
+        if big is not None:
+            return big
+
     def _parse_jsonl_lines(fh):
         for line in fh:
             line = line.strip()
             if not line:
                 continue
             try:
-                entries.append(json.loads(line))
+                entries.append(json_loads(line))
             except Exception as exc:
                 logging.warning(f"Linha JSON inválida ignorada: {exc}")
 
@@ -232,8 +440,8 @@ def merge_env_items(env_path: Path, process_env: dict) -> dict:
     O mapeamento `process_env` (normalmente ``os.environ``) sobrescreve as
     chaves do ficheiro. A função não tem efeitos colaterais.
     """
-    file_items = read_env_file(env_path)
-    # Fazer uma cópia para evitar mutação dos inputs
-    out = dict(file_items)
-    out.update(dict(process_env))
+    # read_env_file já devolve uma cópia própria: dá para mesclar nela direto
+    # (dict.update aceita qualquer mapping, sem copiar o ambiente antes)
+    out = read_env_file(env_path)
+    out.update(process_env)
     return out
@@ -17,22 +17,61 @@ externas.
 from __future__ import annotations
 
 import gzip
-import io
-import json
 import time
 from pathlib import Path
 from typing import Generator
 
+from .log_helpers import json_loads
+
+try:
+    import zstandard as zstd  # type: ignore
+except ImportError:  # dependência opcional (arquivos .zst rotacionados)
+    zstd = None  # type: ignore[assignment]
+
+
+# Tamanho dos blocos lidos de uma vez; as linhas são separadas em memória
+_CHUNK_SIZE = 1 << 20
+
 
 def _open_maybe_gzip(path: Path):
-    """Abre um arquivo suportando gzip por extensão .gz.
+    """Abre um arquivo em modo binário suportando gzip (.gz) e zstd (.zst).
+
+    Chamador deve fechar o objeto.
+    """
+    name = str(path)
+    if name.endswith(".gz"):
+        return gzip.open(path, mode="rb")
+    if name.endswith(".zst"):
+        if zstd is None:
+            raise RuntimeError(f"zstandard não instalado; não é possível ler {path}")
+        return zstd.open(path, mode="rb")
+    return open(path, mode="rb")
 
-    Retorna um file-like em texto (str). Chamador deve fechar o objeto.
+
+_SKIP = object()
+
+
+def _decode_replacing(line: bytes):
+    """Redecodifique uma linha rejeitada por `json_loads` trocando UTF-8 inválido por U+FFFD.
+
+    Equivale à leitura em texto com ``errors="replace"``; retorna `_SKIP`
+    se a linha continuar sem ser JSON válido.
     """
-    if str(path).endswith(".gz"):
-        # gzip.open produz bytes; abrir em modo texto para facilitar leitura de linhas
-        return gzip.open(path, mode="rt", encoding="utf-8", errors="replace")
-    return open(path, mode="r", encoding="utf-8", errors="replace")
+    try:
+        return json_loads(line.decode("utf-8", "replace"))
+    except ValueError:
+        return _SKIP
+
+
+def _decode_line(line: bytes):
+    """Decodifique uma linha JSONL; retorna `_SKIP` para linhas vazias ou inválidas."""
+    line = line.strip()
+    if not line:
+        return _SKIP
+    try:
+        return json_loads(line)
+    except ValueError:
+        return _decode_replacing(line)
 
 
 def iter_jsonl(
@@ -41,10 +80,10 @@ def iter_jsonl(
     max_retries: int = 3,
     retry_delay: float = 0.1,
 ) -> Generator[dict, None, None]:
-    """Itera sobre um arquivo JSONL e produz objetos Python.
+    r"""Itera sobre um arquivo JSONL e produz objetos Python.
 
     Args:
-        path: caminho para arquivo .jsonl ou .jsonl.gz
+        path: caminho para arquivo .jsonl, .jsonl.gz ou .jsonl.zst
         follow: se True, fica aguardando novas linhas (similar a tail -f)
         max_retries: tentativas antes de abandonar leitura em follow=False
         retry_delay: intervalo entre tentativas (segundos)
@@ -54,58 +93,73 @@ def iter_jsonl(
 
     Notas:
         - Linhas vazias ou que não decodificam como JSON são ignoradas.
-        - Em arquivos sendo escritos, parte de uma linha pode aparecer; o
-          leitor irá aguardar pequenas janelas quando follow=True.
+        - Bytes UTF-8 inválidos são substituídos por U+FFFD, sem descartar a linha.
+        - O arquivo é lido em blocos grandes e dividido por '\n' em memória;
+          o trecho após o último '\n' (linha possivelmente parcial) fica no
+          buffer até o restante ser escrito. Sem follow, é decodificado no fim.
 
     """
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(str(p))
 
-    retries = 0
     with _open_maybe_gzip(p) as fh:
-        while True:
-            line = fh.readline()
-            if not line:
-                # EOF atingido
-                if follow:
-                    # aguardar e tentar novamente
-                    time.sleep(retry_delay)
-                    retries = 0
-                    continue
-                if retries < max_retries:
-                    retries += 1
-                    time.sleep(retry_delay)
-                    continue
-                break
+        if follow:
+            yield from _iter_follow(fh, retry_delay)
+        else:
+            yield from _iter_static(fh, max_retries, retry_delay)
+
+
+def _iter_static(fh, max_retries: int, retry_delay: float) -> Generator[dict, None, None]:
+    r"""Leitura sem follow: laço de linhas enxuto, sem desvios de tail -f.
 
-            retries = 0
+    Ao atingir EOF ainda espera até `max_retries` vezes por dados novos antes
+    de decodificar o trecho final sem '\n'.
+    """
+    loads = json_loads
+    retries = 0
+    buf = b""
+    while True:
+        chunk = fh.read(_CHUNK_SIZE)
+        if not chunk:
+            if retries < max_retries:
+                retries += 1
+                time.sleep(retry_delay)
+                continue
+            break
+        retries = 0
+        *lines, buf = (buf + chunk).split(b"\n")
+        for line in lines:
             line = line.strip()
             if not line:
                 continue
             try:
-                obj = json.loads(line)
-            except json.JSONDecodeError:
-                # Linha possivelmente parcial; se estiver no modo follow,
-                # aguardar que o restante seja escrito. Caso contrário,
-                # ignorar a linha.
-                if follow:
-                    # retroceder o cursor na linha atual para tentar ler
-                    # novamente após pequeno delay.
-                    # Nota: apenas possível quando o file object suporta seek().
-                    try:
-                        pos = fh.tell()
-                        # esperar um pouquinho para permitir escrita completa
-                        time.sleep(retry_delay)
-                        fh.seek(pos)
-                        continue
-                    except (OSError, io.UnsupportedOperation):
-                        # Se não suportar seek (ex.: stream), apenas aguardar
-                        time.sleep(retry_delay)
-                        continue
-                # Fora do modo follow, ignorar linha inválida
-                continue
+                obj = loads(line)
+            except ValueError:
+                obj = _decode_replacing(line)
+                if obj is _SKIP:
+                    continue
             yield obj
 
+    # última linha sem '\n' ao final do arquivo
+    obj = _decode_line(buf)
+    if obj is not _SKIP:
+        yield obj
+
+
+def _iter_follow(fh, retry_delay: float) -> Generator[dict, None, None]:
+    """Leitura em modo tail -f: a linha parcial fica no buffer até ser completada."""
+    buf = b""
+    while True:
+        chunk = fh.read(_CHUNK_SIZE)
+        if not chunk:
+            time.sleep(retry_delay)
+            continue
+        *lines, buf = (buf + chunk).split(b"\n")
+        for line in lines:
+            obj = _decode_line(line)
+            if obj is not _SKIP:
+                yield obj
+
 
 __all__ = ["iter_jsonl"]
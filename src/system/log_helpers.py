@@ -9,103 +9,749 @@ para manter consistência com o restante do projeto.
 """
 
 from pathlib import Path
+import atexit
+import functools
 import os
-from datetime import datetime, timezone, date
+from datetime import datetime, date
 import logging
 import gzip
 import shutil
 import time
 import json as _json
 import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Sequence, TextIO
 
 try:
     import portalocker  # type: ignore
 except ImportError:  # dependência opcional
     portalocker = None
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # dependência opcional (serialização mais rápida)
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import zstandard as zstd  # type: ignore
+except ImportError:  # dependência opcional (arquivos .zst em vez de .gz)
+    zstd = None  # type: ignore[assignment]
+
 logger = logging.getLogger(__name__)
 
 ROTATING_SUFFIX = ".rotating"
 
-# Durabilidade controlada via settings ou variável de ambiente
+# Política de sincronização (LOGS_SYNC_MODE):
+#   always   -> fsync a cada escrita (DURABLE_WRITES)
+#   periodic -> só flush por escrita; uma thread faz fsync dos ficheiros
+#               tocados a cada LOGS_SYNC_INTERVAL_SEC (padrão)
+#   never    -> só flush, o SO decide quando gravar
+# Sem LOGS_SYNC_MODE, um LOGS_DURABLE_WRITES explícito (settings ou env)
+# mantém o significado antigo: verdadeiro -> always, falso -> never.
+_SYNC_MODES = ("always", "periodic", "never")
+SYNC_MODE = os.environ.get("LOGS_SYNC_MODE", "").strip().lower()
+if SYNC_MODE not in _SYNC_MODES:
+    try:
+        from config.settings import LOGS_DURABLE_WRITES  # type: ignore
+
+        _durable: bool | None = bool(LOGS_DURABLE_WRITES)
+    except (ImportError, AttributeError):
+        _raw_durable = os.environ.get("LOGS_DURABLE_WRITES")
+        _durable = None if _raw_durable is None else _raw_durable.lower() in ("1", "true", "yes", "on")
+    SYNC_MODE = "periodic" if _durable is None else ("always" if _durable else "never")
+DURABLE_WRITES = SYNC_MODE == "always"
+PERIODIC_SYNC = SYNC_MODE == "periodic"
 try:
-    from config.settings import LOGS_DURABLE_WRITES  # type: ignore
-
-    DURABLE_WRITES = bool(LOGS_DURABLE_WRITES)
-except (ImportError, AttributeError):
-    DURABLE_WRITES = os.environ.get("LOGS_DURABLE_WRITES", "1").lower() in ("1", "true", "yes", "on")
+    _SYNC_INTERVAL_SECONDS = float(os.environ.get("LOGS_SYNC_INTERVAL_SEC", "30"))
+except ValueError:
+    _SYNC_INTERVAL_SECONDS = 30.0
+
+# Só os dados precisam ir para o disco em logs append-only: fdatasync evita
+# o journal de metadados (mtime) quando disponível; senão, fsync.
+_fsync = getattr(os, "fdatasync", os.fsync)
+
+# Opcional (LOGS_DSYNC_WRITES): com O_DSYNC o próprio write() só retorna com
+# os dados no disco, dispensando o fsync separado. Ausente no Windows.
+_O_DSYNC = getattr(os, "O_DSYNC", 0)
+DSYNC_WRITES = os.environ.get("LOGS_DSYNC_WRITES", "0").lower() in ("1", "true", "yes", "on")
+
+# Lock de ficheiro (portalocker) por escrita: necessário só quando outros
+# processos anexam aos mesmos logs (LOGS_MULTIPROC=1). Entre threads deste
+# processo basta o lock por caminho de `_path_lock`, sem ida ao kernel.
+# LOGS_FILE_LOCK, quando definido, continua a forçar o valor explicitamente.
+_MULTIPROC = os.environ.get("LOGS_MULTIPROC", "0")
+FILE_LOCK = os.environ.get("LOGS_FILE_LOCK", _MULTIPROC).lower() in ("1", "true", "yes", "on")
+
+# Um lock por ficheiro: threads que anexam ao mesmo log não intercalam linhas
+_PATH_LOCKS: dict[str, threading.Lock] = {}
+_PATH_LOCKS_GUARD = threading.Lock()
+
+# Diretórios pai já criados por `_write_text_now`: evita um mkdir/stat por linha
+_KNOWN_DIRS: set[str] = set()
+
+# Descritores reaproveitados entre chamadas (opcional, LOGS_FD_CACHE): cada
+# linha vira um único os.write, sem open/fstat/TextIOWrapper. Não combina com
+# portalocker (LOGS_MULTIPROC) nem com O_DSYNC, que seguem o caminho normal.
+FD_CACHE = os.environ.get("LOGS_FD_CACHE", "0").lower() in ("1", "true", "yes", "on")
+_FD_IDLE_SECONDS = 60.0
+
+# Logs humanos (.log) gravados já comprimidos: a rotação só move o ficheiro
+COMPRESS_IN_FLIGHT = os.environ.get("LOGS_COMPRESS_IN_FLIGHT", "0").lower() in ("1", "true", "yes", "on")
+
+# Escrita em lote (opcional): `write_text` só enfileira e uma thread grava
+# as linhas acumuladas de cada ficheiro com um único write + fsync.
+ASYNC_WRITES = os.environ.get("LOGS_ASYNC_WRITES", "0").lower() in ("1", "true", "yes", "on")
+try:
+    _ASYNC_FLUSH_SECONDS = float(os.environ.get("LOGS_ASYNC_FLUSH_SECONDS", "0.2"))
+except ValueError:
+    _ASYNC_FLUSH_SECONDS = 0.2
+# Acorda o flusher antes do intervalo quando um ficheiro acumula tantas linhas
+# ou tantos caracteres pendentes (~64 KiB: um write grande em vez de vários)
+_ASYNC_MAX_PENDING = 1000
+_ASYNC_MAX_CHARS = 64 * 1024
 
 
 # -----------------------
 # Escrita segura
 # -----------------------
-def write_text(path: Path, text: str) -> bool:
+def write_text(path: Path, text: str | bytes) -> bool:
     """Anexe texto a `path` de forma segura, usando lock e fsync quando possível.
 
-    Esta função tenta criar o diretório pai e aplica um lock exclusivo quando
-    a biblioteca `portalocker` estiver disponível. Em caso de falha grava
+    Esta função tenta criar o diretório pai e serializa as threads do processo
+    por ficheiro; o lock exclusivo via `portalocker` só é usado com
+    `LOGS_MULTIPROC=1` (ou `LOGS_FILE_LOCK=1`). Em caso de falha grava
     uma mensagem de warning e segue em modo best-effort.
+
+    Com `LOGS_ASYNC_WRITES` ativo o texto é apenas enfileirado (retorna True)
+    e gravado em lote pelo `_BatchWriter`. Com `LOGS_SYNC_MODE=always` a chamada
+    bloqueia até o fsync, mas escritas concorrentes partilham o mesmo fsync
+    via `_CommitCoordinator`; no modo `periodic` (padrão) o fsync fica a cargo
+    do `_PeriodicSyncer`.
+
+    `bytes` (UTF-8, ex.: linhas do `orjson`) são anexados sem re-encode; só
+    as filas de escrita em lote e group commit, que juntam texto, os decodificam.
     """
+    if ASYNC_WRITES or DURABLE_WRITES:
+        line = text.decode("utf-8") if isinstance(text, bytes) else text
+        if ASYNC_WRITES:
+            return _BATCH_WRITER.submit(path, line)
+        return _COMMITTER.commit(path, line)
+    return _write_text_now(path, text)
+
+
+def _path_lock(path: Path | str) -> threading.Lock:
+    """Retorne o lock de processo associado a `path`, criando-o no primeiro uso."""
+    key = os.fspath(path)
+    lock = _PATH_LOCKS.get(key)
+    if lock is None:
+        with _PATH_LOCKS_GUARD:
+            lock = _PATH_LOCKS.setdefault(key, threading.Lock())
+    return lock
+
+
+def _write_cached_fd(path: Path, data: bytes) -> None:
+    """Anexe `data` pelo descritor em cache de `path` (chamado sob `_path_lock`)."""
+    fd = _FD_CACHE.get(path)
     try:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("a", encoding="utf-8") as fh:
-            locked = False
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+        if DURABLE_WRITES:
             try:
-                if portalocker is not None:
-                    try:
-                        portalocker.lock(fh, portalocker.LOCK_EX)
-                        locked = True
-                    except Exception as exc:
-                        logger.debug("write_text: portalocker.lock falhou em %s: %s", path, exc)
+                _fsync(fd)
+            except OSError as exc:
+                logger.debug("write_text: fsync falhou em %s: %s", path, exc)
+        elif PERIODIC_SYNC:
+            _SYNCER.mark(path)
+    except OSError:
+        # já estamos sob o `_path_lock` de `path`
+        _FD_CACHE.discard_locked(path)
+        raise
 
-                fh.write(text)
-                fh.flush()
 
-                if DURABLE_WRITES:
-                    try:
-                        os.fsync(fh.fileno())
-                    except Exception as exc:
-                        logger.debug("write_text: fsync falhou em %s: %s", path, exc)
-            finally:
-                if locked and portalocker and hasattr(portalocker, "unlock"):
-                    try:
-                        portalocker.unlock(fh)
-                    except Exception as exc:
-                        logger.debug("write_text: portalocker.unlock falhou em %s: %s", path, exc)
+def _open_dsync(path: Path):
+    """Abra `path` para append binário sem buffer com O_DSYNC."""
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | _O_DSYNC, 0o644)
+    return open(fd, "ab", buffering=0)  # noqa: SIM115 - fechado pelo chamador
+
+
+def _write_text_now(path: Path, text: str | bytes) -> bool:
+    """Grave `text` em `path` imediatamente (append + lock + fsync opcional).
+
+    Threads deste processo serializam-se pelo lock de `_path_lock`; o lock de
+    ficheiro via portalocker só é aplicado com `FILE_LOCK` (multiprocesso).
+
+    `bytes` são anexados tal como estão (ex.: membros gzip de `write_text_gz`).
+    """
+    dsync = DURABLE_WRITES and DSYNC_WRITES and bool(_O_DSYNC)
+    binary = isinstance(text, bytes)
+    parent = os.path.dirname(path)
+    try:
+        with _path_lock(path):
+            if parent not in _KNOWN_DIRS:
+                os.makedirs(parent or ".", exist_ok=True)
+                _KNOWN_DIRS.add(parent)
+            if FD_CACHE and not dsync and not FILE_LOCK:
+                _write_cached_fd(path, text if isinstance(text, bytes) else text.encode("utf-8"))
+                return True
+            if dsync:
+                opened = _open_dsync(path)
+            elif binary:
+                opened = path.open("ab")
+            else:
+                opened = path.open("a", encoding="utf-8")
+            with opened as fh:
+                locked = False
+                try:
+                    if portalocker is not None and FILE_LOCK:
+                        try:
+                            portalocker.lock(fh, portalocker.LOCK_EX)
+                            locked = True
+                        except Exception as exc:
+                            logger.debug("write_text: portalocker.lock falhou em %s: %s", path, exc)
+
+                    if dsync:
+                        # sem buffer: cada write() é durável; repete em escrita parcial
+                        view = memoryview(text if isinstance(text, bytes) else text.encode("utf-8"))
+                        while view:
+                            view = view[fh.write(view) :]
+                    else:
+                        fh.write(text)
+                        fh.flush()
+
+                    if DURABLE_WRITES and not dsync:
+                        try:
+                            _fsync(fh.fileno())
+                        except Exception as exc:
+                            logger.debug("write_text: fsync falhou em %s: %s", path, exc)
+                    elif PERIODIC_SYNC:
+                        _SYNCER.mark(path)
+                finally:
+                    if locked and portalocker and hasattr(portalocker, "unlock"):
+                        try:
+                            portalocker.unlock(fh)
+                        except Exception as exc:
+                            logger.debug("write_text: portalocker.unlock falhou em %s: %s", path, exc)
         return True
     except PermissionError as exc:
         # Problemas de permissão não são fatais para o loop principal; registra
         # como WARNING para visibilidade, sem marcar o serviço como falho.
         logger.warning("write_text: permission denied writing to %s: %s", path, exc, exc_info=True)
+        _KNOWN_DIRS.discard(parent)
+        return False
+    except FileNotFoundError as exc:
+        if parent in _KNOWN_DIRS:
+            # diretório removido desde a última escrita: recria e tenta de novo
+            _KNOWN_DIRS.discard(parent)
+            return _write_text_now(path, text)
+        logger.error("write_text: falhou em %s: %s", path, exc, exc_info=True)
         return False
     except OSError as exc:
         logger.error("write_text: falhou em %s: %s", path, exc, exc_info=True)
+        _KNOWN_DIRS.discard(parent)
         return False
 
 
-def write_json(path: Path, obj: dict) -> bool:
-    """Serialize um objeto como JSONL e anexe ao ficheiro `path`.
+def write_text_gz(path: Path, text: str) -> bool:
+    """Anexe `text` a `path` (.gz) como um novo membro gzip.
+
+    Vários membros concatenados formam um gzip válido (lido por `gzip.open`,
+    `zcat`); cada chamada grava um membro completo, então o ficheiro fica
+    legível mesmo se o processo parar entre escritas. Usado pelos logs
+    humanos com `LOGS_COMPRESS_IN_FLIGHT`, dispensando a recompressão na
+    rotação.
+    """
+    return _write_text_now(path, gzip.compress(text.encode("utf-8"), compresslevel=1))
+
+
+class _CommitRequest:
+    __slots__ = ("path", "text", "done", "ok")
+
+    def __init__(self, path: Path, text: str) -> None:
+        self.path = path
+        self.text = text
+        self.done = threading.Event()
+        self.ok = False
+
+
+class _CommitCoordinator:
+    """Group commit síncrono para escritas duráveis.
+
+    Cada chamador enfileira o seu texto; quem conseguir o lock vira o
+    "combinador": drena a fila, junta os textos por caminho e faz um único
+    append + fsync por ficheiro, acordando todos os que esperavam. Os demais
+    apenas aguardam o seu evento (ou assumem a vez se o combinador já saiu).
+    """
 
-    Em caso de objetos não serializáveis por padrão, usa `default=str` como
-    fallback e emite um warning.
+    # Espera máxima antes de tentar assumir o papel de combinador
+    _WAIT_SECONDS = 0.005
+
+    def __init__(self) -> None:
+        self._queue: deque[_CommitRequest] = deque()
+        self._combine = threading.Lock()
+
+    def commit(self, path: Path, text: str) -> bool:
+        req = _CommitRequest(path, text)
+        self._queue.append(req)
+        while True:
+            if self._combine.acquire(blocking=False):
+                try:
+                    self._drain()
+                finally:
+                    self._combine.release()
+                return req.ok
+            if req.done.wait(self._WAIT_SECONDS):
+                return req.ok
+
+    def _drain(self) -> None:
+        queue = self._queue
+        while queue:
+            batch: list[_CommitRequest] = []
+            while queue:
+                batch.append(queue.popleft())
+            groups: dict[Path, list[_CommitRequest]] = {}
+            for req in batch:
+                groups.setdefault(req.path, []).append(req)
+            try:
+                for path, reqs in groups.items():
+                    ok = _write_text_now(path, "".join(r.text for r in reqs))
+                    for r in reqs:
+                        r.ok = ok
+            finally:
+                for req in batch:
+                    req.done.set()
+
+
+_COMMITTER = _CommitCoordinator()
+
+
+class _BatchWriter:
+    """Agrupa textos por caminho e os grava numa thread de fundo.
+
+    Cada ciclo (a cada `interval` segundos, ou antes se um ficheiro acumular
+    `_ASYNC_MAX_PENDING` entradas ou `_ASYNC_MAX_CHARS` caracteres) junta as pendências de cada caminho e faz
+    um único append com lock e, se durável, um único fsync por lote.
     """
+
+    def __init__(self, interval: float) -> None:
+        self._interval = max(0.01, interval)
+        self._pending: dict[Path, list[str]] = {}
+        self._sizes: dict[Path, int] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def submit(self, path: Path, text: str) -> bool:
+        with self._lock:
+            if self._closed:
+                return _write_text_now(path, text)
+            chunks = self._pending.setdefault(path, [])
+            chunks.append(text)
+            size = self._sizes[path] = self._sizes.get(path, 0) + len(text)
+            if len(chunks) >= _ASYNC_MAX_PENDING or size >= _ASYNC_MAX_CHARS:
+                self._wake.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+        return True
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Grave imediatamente tudo o que estiver pendente."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._sizes = {}
+        for path, chunks in pending.items():
+            _write_text_now(path, "".join(chunks))
+
+    def close(self) -> None:
+        """Pare a thread e grave as pendências (chamado no atexit)."""
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+
+_BATCH_WRITER = _BatchWriter(_ASYNC_FLUSH_SECONDS)
+
+
+class _PeriodicSyncer:
+    """Faz fsync periódico dos ficheiros escritos sem fsync imediato.
+
+    Os handles de `write_text` são fechados a cada escrita, por isso são
+    registados caminhos (não descritores); a cada `interval` segundos cada
+    caminho tocado é reaberto e sincronizado uma única vez.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self._interval = max(0.1, interval)
+        self._dirty: set[Path] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def mark(self, path: Path) -> None:
+        with self._lock:
+            self._dirty.add(path)
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="log-syncer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self._interval)
+            self.sync_now()
+
+    def sync_now(self) -> None:
+        """Sincronize já todos os caminhos pendentes (melhor esforço)."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        for path in dirty:
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+            except OSError as exc:
+                # rotacionado ou removido entretanto: nada a sincronizar
+                logger.debug("periodic sync: não foi possível abrir %s: %s", path, exc)
+                continue
+            try:
+                _fsync(fd)
+            except OSError as exc:
+                logger.debug("periodic sync: fsync falhou em %s: %s", path, exc)
+            finally:
+                os.close(fd)
+
+    def close(self) -> None:
+        """Pare a thread e sincronize as pendências (chamado no atexit)."""
+        self._closed = True
+        self._wake.set()
+        self.sync_now()
+
+
+_SYNCER = _PeriodicSyncer(_SYNC_INTERVAL_SECONDS)
+
+
+def flush_all() -> None:
+    """Grave as escritas assíncronas pendentes e sincronize os ficheiros tocados.
+
+    Útil antes de operações que dependem do conteúdo em disco (ex.: cópia ou
+    leitura externa dos logs); no encerramento isto já é feito via atexit.
+    """
+    _BATCH_WRITER.flush()
+    _SYNCER.sync_now()
+
+
+class _FdCache:
+    """Descritores O_APPEND abertos por caminho, fechados após inatividade.
+
+    Uma thread fecha os descritores sem uso há mais de `idle` segundos e,
+    na virada do dia (nomes datados), todos os do dia anterior; a rotação
+    (`atomic_move_to_archive`) invalida o caminho movido para que a próxima
+    escrita abra o ficheiro novo.
+
+    Os writers usam o descritor fora de `self._lock`, só sob `_path_lock`;
+    por isso todo fecho acontece com o `_path_lock` do caminho, para nunca
+    fechar (nem deixar o SO reutilizar) um fd a meio de um `os.write`.
+    """
+
+    def __init__(self, idle: float) -> None:
+        self._idle = max(1.0, idle)
+        self._fds: dict[str, list] = {}  # caminho -> [fd, último uso]
+        self._day = date.today()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def get(self, path: Path) -> int:
+        """Retorne o descritor de `path`, abrindo-o (e criando o ficheiro) se preciso."""
+        key = os.fspath(path)
+        with self._lock:
+            entry = self._fds.get(key)
+            if entry is None:
+                fd = os.open(key, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                entry = self._fds[key] = [fd, 0.0]
+                if self._thread is None and not self._closed:
+                    self._thread = threading.Thread(target=self._run, name="log-fd-evictor", daemon=True)
+                    self._thread.start()
+            entry[1] = time.monotonic()
+            return entry[0]
+
+    def invalidate(self, path: Path | str) -> None:
+        """Feche o descritor em cache de `path`, se houver."""
+        with _path_lock(path):
+            self.discard_locked(path)
+
+    def discard_locked(self, path: Path | str) -> None:
+        """Como `invalidate`, para quem já detém o `_path_lock` de `path`."""
+        with self._lock:
+            entry = self._fds.pop(os.fspath(path), None)
+        if entry is not None:
+            self._close_fd(entry[0])
+
+    def _close_idle(self) -> None:
+        cutoff = time.monotonic() - self._idle
+        with self._lock:
+            idle = [k for k, entry in self._fds.items() if entry[1] < cutoff]
+        for key in idle:
+            with _path_lock(key):
+                with self._lock:
+                    entry = self._fds.get(key)
+                    # usado de novo entretanto: fica para a próxima volta
+                    if entry is None or entry[1] >= cutoff:
+                        continue
+                    del self._fds[key]
+                self._close_fd(entry[0])
+
+    def release_on_date_change(self) -> None:
+        """Feche todos os descritores se o dia mudou desde a última verificação."""
+        today = date.today()
+        if today == self._day:
+            return
+        with self._lock:
+            self._day = today
+            keys = list(self._fds)
+        # um de cada vez sob o lock do caminho: writers a meio de os.write terminam antes
+        for key in keys:
+            self.invalidate(key)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self._idle)
+            self.release_on_date_change()
+            self._close_idle()
+
+    @staticmethod
+    def _close_fd(fd: int) -> None:
+        try:
+            os.close(fd)
+        except OSError as exc:
+            logger.debug("fd cache: close falhou: %s", exc)
+
+    def close(self) -> None:
+        """Pare a thread e feche todos os descritores (chamado no atexit)."""
+        self._closed = True
+        self._wake.set()
+        with self._lock:
+            keys = list(self._fds)
+        for key in keys:
+            self.invalidate(key)
+
+
+_FD_CACHE = _FdCache(_FD_IDLE_SECONDS)
+
+
+def release_stale_fds() -> None:
+    """Feche os descritores em cache do dia anterior (chamado pela rotação)."""
+    _FD_CACHE.release_on_date_change()
+
+
+# atexit executa em ordem inversa: grava o lote assíncrono antes do fsync final
+# e só então fecha os descritores em cache
+atexit.register(_FD_CACHE.close)
+atexit.register(_SYNCER.close)
+atexit.register(_BATCH_WRITER.close)
+
+
+def json_loads(data: str | bytes):
+    """Decodifique uma linha JSON, via `orjson` quando disponível.
+
+    Entradas que o `orjson` rejeita mas o `json` aceita (ex.: `NaN`) são
+    relidas pelo stdlib; erros de decodificação levantam `json.JSONDecodeError`.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return _json.loads(data)
+
+
+def _json_line(path: Path, obj: dict) -> str | None:
+    """Serialize `obj` como uma linha JSONL; retorna None se não for serializável.
+
+    Usa `orjson` quando disponível (saída compacta). Em caso de objetos não
+    serializáveis por padrão, usa `default=str` como fallback e emite um warning.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except (TypeError, ValueError):
+            pass  # tipos que o orjson não aceita seguem as regras do stdlib
+    return _json_line_stdlib(path, obj)
+
+
+def _json_line_bytes(path: Path, obj: dict) -> bytes | None:
+    """Como `_json_line`, mas já em UTF-8 para anexar em modo binário.
+
+    Com `orjson` os bytes gerados seguem direto para o ficheiro, sem o
+    decode para `str` e o novo encode feito pela camada de texto.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+        except (TypeError, ValueError):
+            pass  # tipos que o orjson não aceita seguem as regras do stdlib
+    line = _json_line_stdlib(path, obj)
+    return None if line is None else line.encode("utf-8")
+
+
+def _json_line_stdlib(path: Path, obj: dict) -> str | None:
+    """Serialização via `json` do stdlib, com fallback `default=str`."""
     try:
-        line = _json.dumps(obj, ensure_ascii=False) + "\n"
+        return _json.dumps(obj, ensure_ascii=False) + "\n"
     except (TypeError, ValueError) as exc:
         try:
             line = _json.dumps(obj, ensure_ascii=False, default=str) + "\n"
             # Usa WARNING para serialização de fallback; é recuperável mas
             # indica que tipos não eram estritamente serializáveis.
             logger.warning("write_json: fallback default=str usado em %s: %s", path, exc, exc_info=True)
+            return line
         except Exception as exc2:
             logger.error("write_json: falhou em %s: %s; %s", path, exc, exc2, exc_info=True)
-            return False
+            return None
+
+
+def write_json(path: Path, obj: dict) -> bool:
+    """Serialize um objeto como JSONL e anexe ao ficheiro `path`."""
+    line = _json_line_bytes(path, obj)
+    if line is None:
+        return False
     return write_text(path, line)
 
 
+def write_json_lines(path: Path, objs: list[dict]) -> bool:
+    """Serialize vários objetos como JSONL e anexe-os a `path` numa única escrita."""
+    lines = [line for line in (_json_line_bytes(path, obj) for obj in objs) if line is not None]
+    if not lines:
+        return False
+    return write_text(path, b"".join(lines)) and len(lines) == len(objs)
+
+
+class JsonlAppender:
+    """Mantém handles de append abertos (line-buffered) por caminho.
+
+    Alternativa a `write_text` para ficheiros com escrita frequente que não
+    passam pela rotação de logs: evita open/close a cada linha. O handle é
+    reaberto na virada do dia ou quando o ficheiro foi removido/substituído
+    (inode diferente). Chame `close_all` no encerramento (ex.: via atexit).
+
+    Com `DURABLE_WRITES`, o fsync é feito a cada `fsync_every` escritas (e
+    sempre ao fechar o handle), em vez de a cada linha.
+    """
+
+    def __init__(self, fsync_every: int = 1) -> None:
+        """Crie o appender; `fsync_every` (>= 1) espaça os fsync com `DURABLE_WRITES`."""
+        self._handles: dict[Path, TextIO] = {}
+        self._day = date.today()
+        self._lock = threading.Lock()
+        self._fsync_every = max(1, int(fsync_every))
+        self._pending = 0
+
+    def _get(self, path: Path):
+        today = date.today()
+        if today != self._day:
+            self._close_all_locked()
+            self._day = today
+        fh = self._handles.get(path)
+        if fh is not None:
+            try:
+                stale = os.stat(path).st_ino != os.fstat(fh.fileno()).st_ino
+            except OSError:
+                stale = True
+            if not stale:
+                return fh
+            self._close_locked(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(path, "a", buffering=1, encoding="utf-8")  # noqa: SIM115 - handle de longa duração
+        self._handles[path] = fh
+        return fh
+
+    def append(self, path: Path, text: str) -> bool:
+        """Anexe `text` a `path` reutilizando o handle aberto (best-effort)."""
+        try:
+            with self._lock:
+                fh = self._get(path)
+                locked = False
+                if portalocker is not None and FILE_LOCK:
+                    try:
+                        portalocker.lock(fh, portalocker.LOCK_EX)
+                        locked = True
+                    except Exception as exc:
+                        logger.debug("JsonlAppender: portalocker.lock falhou em %s: %s", path, exc)
+                try:
+                    fh.write(text)
+                    fh.flush()
+                    self._pending += 1
+                    if DURABLE_WRITES and self._pending >= self._fsync_every:
+                        self._pending = 0
+                        try:
+                            _fsync(fh.fileno())
+                        except Exception as exc:
+                            logger.debug("JsonlAppender: fsync falhou em %s: %s", path, exc)
+                    elif PERIODIC_SYNC:
+                        _SYNCER.mark(path)
+                finally:
+                    if locked and hasattr(portalocker, "unlock"):
+                        try:
+                            portalocker.unlock(fh)
+                        except Exception as exc:
+                            logger.debug("JsonlAppender: portalocker.unlock falhou em %s: %s", path, exc)
+            return True
+        except OSError as exc:
+            logger.error("JsonlAppender: falhou em %s: %s", path, exc, exc_info=True)
+            with self._lock:
+                self._close_locked(path)
+            return False
+
+    def append_json(self, path: Path, obj: dict) -> bool:
+        """Serialize `obj` como JSONL (mesmas regras de `write_json`) e anexe a `path`."""
+        line = _json_line(path, obj)
+        if line is None:
+            return False
+        return self.append(path, line)
+
+    def _close_locked(self, path: Path) -> None:
+        fh = self._handles.pop(path, None)
+        if fh is not None:
+            try:
+                fh.flush()
+                if DURABLE_WRITES:
+                    _fsync(fh.fileno())
+                fh.close()
+            except OSError as exc:
+                logger.debug("JsonlAppender: close falhou em %s: %s", path, exc)
+
+    def _close_all_locked(self) -> None:
+        for path in list(self._handles):
+            self._close_locked(path)
+
+    def close_all(self) -> None:
+        """Feche todos os handles abertos."""
+        with self._lock:
+            self._close_all_locked()
+
+
 # -----------------------
 # Normalização e formatação
 # -----------------------
+# Quebras de linha viram espaço numa única passada em C (str.translate)
+_NL_TABLE = str.maketrans({"\n": " ", "\r": " "})
+
+# Sequências de caracteres fora do conjunto seguro viram um único "_"
+_UNSAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]+")
+_SAFE_NAME_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._-")
+
+
+# Poucos nomes distintos (um por log), consultados a cada escrita
+@functools.lru_cache(maxsize=256)
 def sanitize_log_name(raw_name: str, fallback: str = "debug_log") -> str:
     """Sanitiza o nome base de um ficheiro de log para uso seguro no sistema de ficheiros.
 
@@ -113,7 +759,8 @@ def sanitize_log_name(raw_name: str, fallback: str = "debug_log") -> str:
     Retorna um nome seguro adequado para uso como ficheiro.
     """
     rn = Path(raw_name or fallback).name.lstrip(".")
-    name = re.sub(r"[^A-Za-z0-9._-]+", "_", rn)
+    # caso comum: nome já limpo, sem passar pelo regex
+    name = rn if _SAFE_NAME_CHARS.issuperset(rn) else _UNSAFE_NAME_RE.sub("_", rn)
     if not name:
         name = fallback
     if len(name) > 200:
@@ -130,20 +777,28 @@ def normalize_message_for_human(msg, max_len: int | None = 10000) -> str:
         s = "" if msg is None else str(msg)
     except (TypeError, ValueError):
         s = "<unrepr>"
-    s = s.replace("\n", " ").replace("\r", " ")
+    s = s.translate(_NL_TABLE)
     return s[:max_len] if max_len and len(s) > max_len else s
 
 
+_RESERVED_ENTRY_KEYS = frozenset(("ts", "level", "msg"))
+
+
 def build_json_entry(ts: str, level: str, msg, extra: dict | None = None) -> dict:
     """Construa um dicionário pronto para ser serializado em JSONL.
 
     Insere campos `ts`, `level`, `msg` e mescla `extra` quando fornecido.
     """
+    if not extra:
+        return {"ts": ts, "level": level, "msg": msg}
+    if isinstance(extra, dict) and _RESERVED_ENTRY_KEYS.isdisjoint(extra):
+        # caso comum: sem colisão, mescla direta sem laço em Python
+        return {"ts": ts, "level": level, "msg": msg, **extra}
     entry = {"ts": ts, "level": level, "msg": msg}
-    if extra and isinstance(extra, dict):
+    if isinstance(extra, dict):
         for k, v in extra.items():
             entry[k if k not in entry else f"extra_{k}"] = v
-    elif extra:
+    else:
         entry["meta"] = extra
     return entry
 
@@ -180,7 +835,7 @@ def build_human_line(ts: str, level: str, msg_str: str, extras: dict | None = No
         return header + body + "\n\n"
     else:
         # Formato legado: flatten de quebras de linha para espaços
-        single = body.replace("\n", " ").replace("\r", " ").strip()
+        single = body.translate(_NL_TABLE).strip()
         return f"{ts} [{level}]{extras_part} {single}\n"
 
 
@@ -189,16 +844,11 @@ def _format_extras_for_human(extras: dict | None) -> str:
 
     Extraída de `build_human_line` para reduzir a complexidade desta função.
     """
-    extras_part = ""
-    if extras and isinstance(extras, dict):
-        kvs = []
-        for k, v in extras.items():
-            sval = str(v) if not isinstance(v, (list, dict)) else repr(v)
-            sval = sval.replace("\n", " ").replace("\r", " ")
-            kvs.append(f"{k}={sval}")
-        if kvs:
-            extras_part = " " + " ".join(kvs)
-    return extras_part
+    if not extras or not isinstance(extras, dict):
+        return ""
+    return "".join(
+        f" {k}={(repr(v) if isinstance(v, (list, dict)) else str(v)).translate(_NL_TABLE)}" for k, v in extras.items()
+    )
 
 
 def _should_use_multiline(msg_str: object) -> bool:
@@ -222,6 +872,26 @@ def _should_use_multiline(msg_str: object) -> bool:
     return False
 
 
+# Último segundo formatado por `iso_utc_now`: (segundo epoch, "YYYY-MM-DDTHH:MM:SS")
+_TS_CACHE: tuple[int, str] = (-1, "")
+
+
+def iso_utc_now() -> str:
+    """Retorne o instante atual em ISO-8601 UTC com microssegundos.
+
+    Equivale a `datetime.now(timezone.utc).isoformat()` (sempre com a fração),
+    mas o prefixo até aos segundos só é formatado quando o segundo muda.
+    """
+    global _TS_CACHE
+    now = time.time()
+    sec = int(now)
+    cached_sec, prefix = _TS_CACHE
+    if sec != cached_sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        _TS_CACHE = (sec, prefix)
+    return f"{prefix}.{int((now - sec) * 1_000_000):06d}+00:00"
+
+
 def format_date_for_log(dt=None) -> str:
     """Retorna data no formato YYYY-MM-DD (segura para nomes)."""
     try:
@@ -233,32 +903,40 @@ def format_date_for_log(dt=None) -> str:
             return dt.date().isoformat()
         if isinstance(dt, date):
             return dt.isoformat()
-        return datetime.now(timezone.utc).date().isoformat()
+        return time.strftime("%Y-%m-%d", time.gmtime())
     except (AttributeError, TypeError):
-        return datetime.now(timezone.utc).date().isoformat()
+        return time.strftime("%Y-%m-%d", time.gmtime())
 
 
 # -----------------------
 # Verificação de idade
 # -----------------------
-def is_older_than(p: Path, seconds: int) -> bool:
-    """Return True se o ficheiro tiver mtime mais antigo que `seconds`."""
-    try:
-        st = p.stat()
-    except OSError as exc:
-        logger.error("is_older_than: falha ao acessar %s: %s", p, exc, exc_info=True)
-        return False
-    now_ts = datetime.now(timezone.utc).timestamp()
+def is_older_than(p: Path, seconds: int, *, st: os.stat_result | None = None, now_ts: float | None = None) -> bool:
+    """Return True se o ficheiro tiver mtime mais antigo que `seconds`.
+
+    `st` permite reaproveitar um stat já obtido (ex.: `os.scandir`) e `now_ts`
+    um instante único para uma varredura inteira.
+    """
+    if st is None:
+        try:
+            st = os.stat(p)
+        except OSError as exc:
+            logger.error("is_older_than: falha ao acessar %s: %s", p, exc, exc_info=True)
+            return False
+    # time.time() já é epoch UTC; evita alocar um datetime por ficheiro
+    if now_ts is None:
+        now_ts = time.time()
     return st.st_mtime <= (now_ts - int(seconds))
 
 
-def archive_file_is_old(p: Path, now_ts: float, retention_days: int) -> bool:
+def archive_file_is_old(p: Path, now_ts: float, retention_days: int, *, st: os.stat_result | None = None) -> bool:
     """Return True se o ficheiro em archive for mais antigo que `retention_days`."""
-    try:
-        st = p.stat()
-    except OSError as exc:
-        logger.error("archive_file_is_old: falha ao acessar %s: %s", p, exc, exc_info=True)
-        return False
+    if st is None:
+        try:
+            st = os.stat(p)
+        except OSError as exc:
+            logger.error("archive_file_is_old: falha ao acessar %s: %s", p, exc, exc_info=True)
+            return False
     cutoff = now_ts - retention_days * 86400
     return st.st_mtime < cutoff
 
@@ -266,16 +944,7 @@ def archive_file_is_old(p: Path, now_ts: float, retention_days: int) -> bool:
 # -----------------------
 # Rotação / Compressão
 # -----------------------
-def _attempt_rename(s: Path, d: Path) -> bool:
-    try:
-        s.rename(d)
-        return True
-    except OSError as exc:
-        logger.debug("atomic_move_to_archive: rename failed: %s", exc)
-        return False
-
-
-def _attempt_replace(s: Path, d: Path) -> bool:
+def _attempt_replace(s: str | Path, d: str | Path) -> bool:
     try:
         os.replace(s, d)
         return True
@@ -302,16 +971,44 @@ def _copy_replace_fallback(s: Path, d: Path) -> bool:
         return False
 
 
+def _fsync_dir(d: Path) -> None:
+    """Sincronize a entrada de diretório de `d` (POSIX; melhor esforço).
+
+    Sem isto um rename concluído pode desaparecer após queda de energia:
+    o conteúdo do ficheiro está no disco, mas o diretório ainda não.
+    """
+    flag = getattr(os, "O_DIRECTORY", None)
+    if flag is None:
+        return
+    try:
+        fd = os.open(d, os.O_RDONLY | flag)
+    except OSError as exc:
+        logger.debug("fsync_dir: não foi possível abrir %s: %s", d, exc)
+        return
+    try:
+        os.fsync(fd)
+    except OSError as exc:
+        logger.debug("fsync_dir: fsync falhou em %s: %s", d, exc)
+    finally:
+        os.close(fd)
+
+
 def atomic_move_to_archive(src: Path, dst_rotating: Path) -> bool:
-    """Move `src` para `dst_rotating` de forma atômica, com backoff e fallbacks."""
+    """Move `src` para `dst_rotating` de forma atômica, com backoff e fallbacks.
+
+    `os.replace` é atômico e sobrescreve o destino em POSIX e Windows, por isso
+    não há tentativa prévia com `Path.rename`. Salvo em `LOGS_SYNC_MODE=never`,
+    o diretório de destino é sincronizado após o move.
+    """
     attempts = 5
     base_delay = 0.05
+    src_s, dst_s = os.fspath(src), os.fspath(dst_rotating)
     for i in range(attempts):
-        if _attempt_rename(src, dst_rotating):
-            return True
-        if _attempt_replace(src, dst_rotating):
-            return True
-        if _copy_replace_fallback(src, dst_rotating):
+        if _attempt_replace(src_s, dst_s) or _copy_replace_fallback(src, dst_rotating):
+            # o descritor em cache ainda aponta para o ficheiro movido
+            _FD_CACHE.invalidate(src)
+            if SYNC_MODE != "never":
+                _fsync_dir(dst_rotating.parent)
             return True
         if i + 1 < attempts:
             time.sleep(base_delay * (2**i))
@@ -323,13 +1020,36 @@ def atomic_move_to_archive(src: Path, dst_rotating: Path) -> bool:
     return False
 
 
+# Nível 6 (padrão do zlib): bem mais rápido que o 9 do gzip.open com taxa
+# quase igual em texto de log; blocos grandes reduzem o overhead por chamada.
+# LOGS_GZIP_LEVEL=1 troca um pouco de taxa por bem menos CPU na rotação.
+try:
+    _GZIP_LEVEL = min(9, max(1, int(os.environ.get("LOGS_GZIP_LEVEL", "6"))))
+except ValueError:
+    _GZIP_LEVEL = 6
+_COMPRESS_CHUNK = 1 << 20
+
+# zstd nível 3: taxa próxima do gzip -6 com várias vezes a vazão. Usado na
+# rotação quando `zstandard` está instalado (LOGS_ARCHIVE_CODEC=gzip desliga).
+_ZSTD_LEVEL = 3
+ZSTD_ARCHIVES = zstd is not None and os.environ.get("LOGS_ARCHIVE_CODEC", "zstd").lower() != "gzip"
+
+
 def compress_file(src: Path, dst_gz: Path) -> bool:
     """Comprime `src` em gzip `dst_gz`. Usa escrita temporária + replace atômico."""
     dst_gz.parent.mkdir(parents=True, exist_ok=True)
     tmp = dst_gz.with_suffix(dst_gz.suffix + ".tmp")
     try:
-        with src.open("rb") as rf, gzip.open(tmp, "wb") as gf:
-            shutil.copyfileobj(rf, gf)
+        buf = bytearray(_COMPRESS_CHUNK)
+        view = memoryview(buf)
+        with (
+            src.open("rb", buffering=0) as rf,
+            open(tmp, "wb", buffering=_COMPRESS_CHUNK) as wf,
+            gzip.open(wf, "wb", compresslevel=_GZIP_LEVEL) as gf,
+        ):
+            # buffer fixo reutilizado: sem alocar um bytes novo a cada bloco
+            while n := rf.readinto(buf):
+                gf.write(view[:n])
         os.replace(str(tmp), str(dst_gz))
         return True
     except OSError as exc:
@@ -338,47 +1058,133 @@ def compress_file(src: Path, dst_gz: Path) -> bool:
         return False
 
 
-def try_rotate_file(p: Path, archive_dir: Path, gz_suffix: str, day_secs: int, week_secs: int) -> None:
+def compress_file_zstd(src: Path, dst_zst: Path) -> bool:
+    """Comprime `src` em zstd `dst_zst` (escrita temporária + replace atômico)."""
+    if zstd is None:
+        return False
+    dst_zst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst_zst.with_suffix(dst_zst.suffix + ".tmp")
+    try:
+        with src.open("rb") as rf, open(tmp, "wb") as wf:
+            cctx = zstd.ZstdCompressor(level=_ZSTD_LEVEL)
+            cctx.copy_stream(rf, wf, size=os.fstat(rf.fileno()).st_size, read_size=_COMPRESS_CHUNK)
+        os.replace(tmp, dst_zst)
+        return True
+    except (OSError, zstd.ZstdError) as exc:
+        logger.error("compress_file_zstd: falha %s -> %s: %s", src, dst_zst, exc, exc_info=True)
+        tmp.unlink(missing_ok=True)
+        return False
+
+
+def _compress_to_archive(src: Path, gz_path: Path) -> bool:
+    """Comprima `src` para o archive: `.zst` quando disponível, senão `gz_path`."""
+    if ZSTD_ARCHIVES:
+        return compress_file_zstd(src, gz_path.with_suffix(".zst"))
+    return compress_file(src, gz_path)
+
+
+def try_rotate_file(
+    p: Path, archive_dir: Path, gz_suffix: str, day_secs: int, week_secs: int, *, st: os.stat_result | None = None
+) -> None:
     """Move e comprime ficheiro de log para archive, respeitando safe-retention."""
-    threshold = week_secs if "_safe" in p.name else day_secs
-    if not is_older_than(p, threshold):
+    name = p.name
+    threshold = week_secs if "_safe" in name else day_secs
+    if not is_older_than(p, threshold, st=st):
         return
-    rotating = archive_dir / (p.name + ROTATING_SUFFIX)
+    rotating = archive_dir / (name + ROTATING_SUFFIX)
     if not atomic_move_to_archive(p, rotating):
         return
     gz_path = archive_dir / f"{p.stem}{gz_suffix}"
-    if compress_file(rotating, gz_path):
+    if _compress_to_archive(rotating, gz_path):
         rotating.unlink(missing_ok=True)
 
 
-def try_compress_rotating(rotating: Path, archive_dir: Path, day_secs: int, week_secs: int) -> None:
+def try_move_compressed(
+    p: Path, archive_dir: Path, day_secs: int, week_secs: int, *, st: os.stat_result | None = None
+) -> None:
+    """Move para archive um log já comprimido em escrita (`.log.gz`), sem recomprimir."""
+    name = p.name
+    threshold = week_secs if "_safe" in name else day_secs
+    if not is_older_than(p, threshold, st=st):
+        return
+    dst = archive_dir / name
+    if dst.exists():
+        # não sobrescrever um archive do mesmo dia gerado pela rotação normal
+        base = name[: -len(".log.gz")] if name.endswith(".log.gz") else name.removesuffix(".gz")
+        dst = archive_dir / f"{base}-inflight.log.gz"
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    atomic_move_to_archive(p, dst)
+
+
+def try_compress_rotating(
+    rotating: Path, archive_dir: Path, day_secs: int, week_secs: int, *, st: os.stat_result | None = None
+) -> None:
     """Tenta comprimir um ficheiro `.rotating` já movido para archive."""
     threshold = week_secs if "_safe" in rotating.name else day_secs
-    if not is_older_than(rotating, threshold):
+    if not is_older_than(rotating, threshold, st=st):
         return
     gz_path = archive_dir / (rotating.stem + ".gz")
-    if compress_file(rotating, gz_path):
+    if _compress_to_archive(rotating, gz_path):
         rotating.unlink(missing_ok=True)
 
 
+# Rotação é I/O (stat, rename, fsync) e zlib/zstd liberam o GIL: alguns
+# ficheiros em paralelo sobrepõem a espera de disco
+_ROTATION_WORKERS = min(8, os.cpu_count() or 2)
+
+
+def run_rotation_jobs(jobs: Sequence[Callable[[], None]]) -> None:
+    """Execute tarefas de rotação/compressão por ficheiro, em paralelo quando houver várias.
+
+    Cada tarefa é isolada: uma exceção é registada e não impede as demais.
+    Com uma única tarefa (ou um único worker) roda inline, sem criar pool.
+    """
+
+    def _guarded(job: Callable[[], None]) -> None:
+        try:
+            job()
+        except Exception as exc:
+            logger.error("rotação: tarefa falhou: %s", exc, exc_info=True)
+
+    workers = min(_ROTATION_WORKERS, len(jobs))
+    if workers <= 1:
+        for job in jobs:
+            _guarded(job)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rotate") as ex:
+        list(ex.map(_guarded, jobs))
+
+
 # -----------------------
 # Limpeza temporária
 # -----------------------
-def all_children_old(d: Path, max_age: int) -> bool:
+def all_children_old(d: Path, max_age: int, *, now_ts: float | None = None) -> bool:
     """Retorna True se todos os filhos de `d` tiverem idade maior que `max_age`."""
+    if now_ts is None:
+        now_ts = time.time()
     try:
-        return all(is_older_than(c, max_age) for c in d.iterdir())
+        with os.scandir(d) as it:
+            for entry in it:
+                if not is_older_than(Path(entry.path), max_age, st=entry.stat(), now_ts=now_ts):
+                    return False
+        return True
     except OSError:
         return False
 
 
-def process_temp_item(item: Path, max_age: int) -> None:
+def process_temp_item(item: Path, max_age: int, *, now_ts: float | None = None) -> None:
     """Remove ficheiros ou diretórios temporários antigos."""
+    if now_ts is None:
+        now_ts = time.time()
     try:
-        if item.is_file() and is_older_than(item, max_age):
+        if item.is_file() and is_older_than(item, max_age, now_ts=now_ts):
             item.unlink(missing_ok=True)
             logger.info("Removido %s", item)
-        elif item.is_dir() and all_children_old(item, max_age) and is_older_than(item, max_age):
+        elif (
+            item.is_dir()
+            and all_children_old(item, max_age, now_ts=now_ts)
+            and is_older_than(item, max_age, now_ts=now_ts)
+        ):
             shutil.rmtree(item, ignore_errors=True)
             logger.info("Removido diretório %s", item)
     except OSError as exc:
@@ -388,8 +1194,21 @@ def process_temp_item(item: Path, max_age: int) -> None:
 # -----------------------
 # Diretórios / permissões
 # -----------------------
+# Diretórios já validados por `ensure_dir_writable` neste processo
+_ENSURED_DIRS: set[str] = set()
+
+
 def ensure_dir_writable(p: Path) -> bool:
-    """Garante, em melhor esforço, que `p` existe e é gravável."""
+    """Garante, em melhor esforço, que `p` existe e é gravável.
+
+    A sonda de escrita roda só na primeira vez por diretório; depois basta
+    confirmar que ele ainda existe (um stat), recriando-o se foi removido.
+    """
+    key = os.fspath(p)
+    if key in _ENSURED_DIRS:
+        if os.path.isdir(key):
+            return True
+        _ENSURED_DIRS.discard(key)
     try:
         p.mkdir(parents=True, exist_ok=True)
         test = p / f".touch-{os.getpid()}"
@@ -414,6 +1233,7 @@ def ensure_dir_writable(p: Path) -> bool:
                 # Ignorar falhas de limpeza; operação em modo de melhor esforço
                 # nosec B110 - a limpeza não deve lançar exceção no caminho de melhor esforço
                 pass
+        _ENSURED_DIRS.add(key)
         return True
     except PermissionError as exc:
         logger.warning("ensure_dir_writable: permission denied creating %s: %s", p, exc, exc_info=True)
@@ -6,30 +6,36 @@ preparam diretórios, nomeiam ficheiros e expõem API simples para gravação
 humana e JSONL para ingestão.
 """
 
+import functools
 import os
 
 # comentários e notas internas mantidas mínimos; errno não é necessário
 import logging
 
 import time
-from dataclasses import dataclass
-from datetime import datetime, timezone
+from dataclasses import dataclass, field
 
 from pathlib import Path
 from typing import Optional
 
+from . import log_helpers as _log_helpers
 from .log_helpers import (
     ROTATING_SUFFIX,
     archive_file_is_old,
     build_human_line,
     build_json_entry,
     format_date_for_log,
+    iso_utc_now,
     normalize_message_for_human,
+    release_stale_fds,
+    run_rotation_jobs,
     sanitize_log_name,
     try_compress_rotating,
+    try_move_compressed,
     try_rotate_file,
-    write_json,
+    write_json_lines,
     write_text,
+    write_text_gz,
     ensure_dir_writable,
 )
 
@@ -64,7 +70,8 @@ class LogPaths:
     """Agrupa caminhos usados pelo subsistema de logging.
 
     Contém os diretórios root, log, json, archive e debug usados por
-    funções de escrita, rotação e limpeza.
+    funções de escrita, rotação e limpeza. As variantes `*_str` guardam o
+    `os.fspath` de cada diretório, calculado uma vez, para as varreduras.
     """
 
     root: Path
@@ -72,6 +79,16 @@ class LogPaths:
     json_dir: Path
     archive_dir: Path
     debug_dir: Path
+    log_dir_str: str = field(init=False, repr=False, compare=False)
+    json_dir_str: str = field(init=False, repr=False, compare=False)
+    archive_dir_str: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        """Pré-calcule as versões `str` dos diretórios usadas nas varreduras."""
+        # dataclass congelada: atribuição via object.__setattr__
+        object.__setattr__(self, "log_dir_str", os.fspath(self.log_dir))
+        object.__setattr__(self, "json_dir_str", os.fspath(self.json_dir))
+        object.__setattr__(self, "archive_dir_str", os.fspath(self.archive_dir))
 
     def __iter__(self):
         """Iterador simples que retorna tupla com os principais paths."""
@@ -118,11 +135,17 @@ def _resolve_filename(name: str, safe_log_enable: bool) -> str:
 
     Inclui normalização do nome e sufixo `_safe` quando solicitado.
     """
+    return _filename_for_date(name, safe_log_enable, format_date_for_log(None))
+
+
+# Poucos nomes de log por dia: a data faz parte da chave, então a virada
+# do dia gera entradas novas sem invalidação explícita
+@functools.lru_cache(maxsize=256)
+def _filename_for_date(name: str, safe_log_enable: bool, date_str: str) -> str:
     default = DEBUG_LOG_FILENAME
     base = sanitize_log_name(name or default, default)
     if safe_log_enable:
         base = f"{base}_safe"
-    date_str = format_date_for_log(None)
     return f"{base}-{date_str}"
 
 
@@ -186,7 +209,9 @@ def write_log(
         aplicável.
 
     Observações de robustez:
-      - As escritas usam helpers atômicos (`write_text`, `write_json`) que
+      - Cada destino recebe uma única escrita por chamada (todas as
+        mensagens do lote), via helpers atômicos (`write_text`,
+        `write_json_lines`) que
         retornam ``True``/``False``; esta função ignora falhas de escrita
         (não propaga exceções) mas regista warnings quando uma gravação falhar.
       - A função não tem valor de retorno (side-effect only). Chamadores devem
@@ -207,36 +232,34 @@ def write_log(
     extras_list = _normalize_extras(extra, len(messages))
 
     lp = get_log_paths()
-    plain_path = lp.log_dir / f"{filename}.log"
+    # com LOGS_COMPRESS_IN_FLIGHT o log humano já nasce comprimido
+    plain_path = lp.log_dir / (f"{filename}.log.gz" if _log_helpers.COMPRESS_IN_FLIGHT else f"{filename}.log")
     jsonl_path = lp.json_dir / f"{filename}.jsonl"
 
-    for idx, msg in enumerate(messages):
-        ts = datetime.now(timezone.utc).isoformat()
-
+    # As linhas de cada destino são acumuladas e gravadas numa única escrita
+    if human_enable:
         # Preserve multi-line human messages for the hourly summary log or
         # when writing to a safe file. Historically the normalize step
         # flattened newlines; when writing the canonical dated `_safe` files
         # we want to preserve the original multiline human text.
-        if human_enable and (name == "monitoring-hourly" or safe_log_enable) and isinstance(msg, str):
-            human_msg = msg
-        else:
-            human_msg = normalize_message_for_human(msg)
-
-        if human_enable:
-            _perform_human_write(
-                plain_path,
-                name,
-                level,
-                human_msg,
-                extras_list[idx],
-                hourly,
-                hourly_window_seconds,
-                log,
-            )
-
-        if json_enable:
-            per_extra = extras_list[idx]
-            _perform_json_write(jsonl_path, ts, level, msg, per_extra)
+        keep_multiline = name == "monitoring-hourly" or safe_log_enable
+        human_msgs = [
+            msg if keep_multiline and isinstance(msg, str) else normalize_message_for_human(msg) for msg in messages
+        ]
+        _perform_human_write(
+            plain_path,
+            name,
+            level,
+            human_msgs,
+            extras_list,
+            hourly,
+            hourly_window_seconds,
+            log,
+        )
+
+    if json_enable:
+        # um único instante para o lote (todas as mensagens são da mesma chamada)
+        _perform_json_write(jsonl_path, iso_utc_now(), level, messages, extras_list)
 
 
 # Auxiliar de write_log: decide se a escrita humana é permitida pela janela hourly
@@ -272,13 +295,13 @@ def _hourly_allows_write(
         return True
 
 
-# Auxiliar de write_log: escreve linha humana em .log e atualiza timestamp hourly
+# Auxiliar de write_log: escreve linhas humanas em .log e atualiza timestamp hourly
 def _perform_human_write(
     plain_path: Path,
     name: str,
     level: str,
-    human_msg: str,
-    extra: dict | None,
+    human_msgs: list[str],
+    extras: list[dict | None],
     hourly: bool,
     hourly_window_seconds: int,
     log: bool,
@@ -286,8 +309,9 @@ def _perform_human_write(
     """Executa a escrita humana em arquivo, respeitando flags e janela hourly.
 
     Detalhes:
-      - Constrói uma linha de texto legível com timestamp e level via
-        `build_human_line` e delega para `write_text` (que faz escrita atômica).
+      - A janela hourly é verificada uma vez para o lote inteiro.
+      - Constrói uma linha de texto legível por mensagem via `build_human_line`
+        e grava todas com uma única chamada a `write_text` (escrita atômica).
       - Se `write_text` falhar, um WARNING é registado; a função tenta não
         propagar exceções para não interromper o loop principal.
       - Quando `hourly` está ativo e a escrita for bem-sucedida, atualiza um
@@ -299,8 +323,10 @@ def _perform_human_write(
         return
 
     if _hourly_allows_write(name, hourly, hourly_window_seconds):
-        human_line = build_human_line(format_date_for_log(None), level, human_msg, extra)
-        ok = write_text(plain_path, human_line)
+        date_str = format_date_for_log(None)
+        text = "".join(build_human_line(date_str, level, msg, extra) for msg, extra in zip(human_msgs, extras))
+        writer = write_text_gz if plain_path.name.endswith(".gz") else write_text
+        ok = writer(plain_path, text)
         if not ok:
             logger.warning("_perform_human_write: falha ao escrever human log %s", plain_path)
         if hourly and ok:
@@ -328,19 +354,21 @@ def _perform_human_write(
             logger.debug("human write ignorado pela janela hourly")
 
 
-# Auxiliar de write_log: constrói e grava um objeto JSON em jsonl para ingestão
-def _perform_json_write(jsonl_path: Path, ts: str, level: str, msg, extra: dict | None) -> None:
-    """Constrói o objeto JSON e delega para write_json.
+# Auxiliar de write_log: constrói e grava os objetos JSON em jsonl para ingestão
+def _perform_json_write(jsonl_path: Path, ts: str, level: str, msgs: list, extras: list) -> None:
+    """Constrói um objeto JSON por mensagem e grava o lote com write_json_lines.
 
     Mantém formato compatível com consumidores de métricas/ingestão.
     """
-    # Evitar incluir sumários orientados ao humano no feed JSON canónico.
-    # Manter apenas chaves e métricas legíveis por máquinas.
-    safe_extra = None
-    if isinstance(extra, dict):
-        safe_extra = {k: v for k, v in extra.items() if k not in ("summary_short", "summary_long")}
-    json_obj = build_json_entry(ts, level, msg, safe_extra)
-    ok = write_json(jsonl_path, json_obj)
+    entries = []
+    for msg, extra in zip(msgs, extras):
+        # Evitar incluir sumários orientados ao humano no feed JSON canónico.
+        # Manter apenas chaves e métricas legíveis por máquinas.
+        safe_extra = None
+        if isinstance(extra, dict):
+            safe_extra = {k: v for k, v in extra.items() if k not in ("summary_short", "summary_long")}
+        entries.append(build_json_entry(ts, level, msg, safe_extra))
+    ok = write_json_lines(jsonl_path, entries)
     if ok is False:
         logger.warning("_perform_json_write: falha ao escrever jsonl %s", jsonl_path)
 
@@ -396,11 +424,38 @@ def ensure_log_dirs_exist(root: str | Path | None = None) -> None:
 # ========================
 
 
+def _scan_files(d: str | Path, suffixes: tuple[str, ...]) -> list[tuple[Path, os.stat_result]]:
+    """Retorne `(caminho, stat)` dos ficheiros de `d` terminados em `suffixes`, por nome.
+
+    Uma única passada de `os.scandir` substitui um glob por padrão, e o stat
+    obtido aqui é repassado às verificações de idade. Ocultos são ignorados
+    (como no glob); diretório ausente resulta em lista vazia.
+    """
+    found: list[tuple[str, str, os.stat_result]] = []
+    try:
+        with os.scandir(d) as it:
+            for entry in it:
+                name = entry.name
+                if name.startswith(".") or not name.endswith(suffixes):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    found.append((name, entry.path, entry.stat()))
+                except OSError:
+                    continue
+    except OSError:
+        return []
+    # ordena pelas strings e só então cria os Path
+    found.sort(key=lambda item: item[0])
+    return [(Path(path), st) for _name, path, st in found]
+
+
 def rotate_logs(day_secs: int | None = None, week_secs: int | None = None) -> None:
     """Rotaciona logs para archive."""
+    # descritores em cache (LOGS_FD_CACHE) ainda abertos nos ficheiros de ontem
+    release_stale_fds()
     lp = get_log_paths()
-    log_dir = lp.log_dir
-    json_dir = lp.json_dir
     archive_dir = lp.archive_dir
 
     if day_secs is None:
@@ -409,45 +464,52 @@ def rotate_logs(day_secs: int | None = None, week_secs: int | None = None) -> No
         week_secs = 7 * day_secs
 
     patterns = (
-        (json_dir, "*.jsonl", ".jsonl.gz"),
-        (log_dir, "*.log", ".log.gz"),
+        (lp.json_dir_str, ".jsonl", ".jsonl.gz"),
+        (lp.log_dir_str, ".log", ".log.gz"),
+    )
+    jobs = [
+        functools.partial(try_rotate_file, p, archive_dir, gz_suffix, day_secs, week_secs, st=st)
+        for src_dir, suffix, gz_suffix in patterns
+        for p, st in _scan_files(src_dir, (suffix,))
+    ]
+    # logs humanos comprimidos em escrita (LOGS_COMPRESS_IN_FLIGHT): só mover
+    jobs.extend(
+        functools.partial(try_move_compressed, p, archive_dir, day_secs, week_secs, st=st)
+        for p, st in _scan_files(lp.log_dir_str, (".log.gz",))
     )
-    for src_dir, glob_pat, gz_suffix in patterns:
-        for p in sorted(src_dir.glob(glob_pat)):
-            try_rotate_file(p, archive_dir, gz_suffix, day_secs, week_secs)
+    run_rotation_jobs(jobs)
 
 
 def compress_old_logs(day_secs: int | None = None, week_secs: int | None = None) -> None:
     """Comprime arquivos rotativos antigos."""
-    archive_dir = get_log_paths().archive_dir
-    if not archive_dir.exists():
-        return
+    lp = get_log_paths()
+    archive_dir = lp.archive_dir
 
     if day_secs is None:
         day_secs = 24 * 60 * 60
     if week_secs is None:
         week_secs = 7 * day_secs
 
-    for rotating in sorted(archive_dir.glob(f"*{ROTATING_SUFFIX}")):
-        try_compress_rotating(rotating, archive_dir, day_secs, week_secs)
+    run_rotation_jobs(
+        [
+            functools.partial(try_compress_rotating, rotating, archive_dir, day_secs, week_secs, st=st)
+            for rotating, st in _scan_files(lp.archive_dir_str, (ROTATING_SUFFIX,))
+        ]
+    )
 
 
 def safe_remove(retention_days: int = 7, safe_retention_days: int | None = 30) -> None:
     """Remove arquivos antigos do archive."""
-    archive_dir = get_log_paths().archive_dir
-    if not archive_dir.exists():
-        return
-
-    now_ts = datetime.now(timezone.utc).timestamp()
-    patterns = ["*.jsonl.gz", "*.log.gz", f"*{ROTATING_SUFFIX}"]
-
-    for pat in patterns:
-        for p in sorted(archive_dir.glob(pat)):
-            rd = safe_retention_days if ("_safe" in p.name and safe_retention_days is not None) else retention_days
-            if not archive_file_is_old(p, now_ts, rd):
-                continue
-            try:
-                p.unlink()
-                logger.info("safe_remove: removed %s", p)
-            except Exception as exc:
-                logger.error("safe_remove: falha ao remover %s: %s", p, exc, exc_info=True)
+    archive_dir = get_log_paths().archive_dir_str
+
+    now_ts = time.time()
+    # um único scandir do archive para todos os padrões
+    for p, st in _scan_files(archive_dir, (".jsonl.gz", ".log.gz", ".jsonl.zst", ".log.zst", ROTATING_SUFFIX)):
+        rd = safe_retention_days if ("_safe" in p.name and safe_retention_days is not None) else retention_days
+        if not archive_file_is_old(p, now_ts, rd, st=st):
+            continue
+        try:
+            p.unlink()
+            logger.info("safe_remove: removed %s", p)
+        except Exception as exc:
+            logger.error("safe_remove: falha ao remover %s: %s", p, exc, exc_info=True)
@@ -83,7 +83,8 @@ class NetworkUsageLearningHandler:
         # Fallback: tentar ler do jsonl de monitoramento se não houver dados suficientes
         if not entries or len(entries) < self.LEARNING_WEEKS * 7:
             monitor_path = Path("logs/json/monitoring-{}.jsonl".format(datetime.date.today().strftime("%Y-%m-%d")))
-            entries += read_jsonl(monitor_path)
+            # log de monitoramento é append-only: parse incremental entre chamadas
+            entries += read_jsonl(monitor_path, cache=True)
         return entries
 
     def _save_data(self, data):
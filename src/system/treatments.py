@@ -7,6 +7,7 @@ import string
 import subprocess
 import sys
 import tempfile
+import time
 from pathlib import Path
 from typing import List, Optional
 
@@ -20,16 +21,34 @@ logger = logging.getLogger(__name__)
 
 _excess_since: Optional[float] = None
 
+# NETWORK_TREATMENT_ALLOWED_HOUR já convertido: (valor bruto do env, hora ou None)
+_allowed_hour_cache: tuple[Optional[str], Optional[int]] = (None, None)
+
+
+def _allowed_hour() -> Optional[int]:
+    """Retorne a hora permitida para o tratamento de rede (reconverte só se o env mudar)."""
+    global _allowed_hour_cache
+    raw = os.environ.get("NETWORK_TREATMENT_ALLOWED_HOUR")
+    cached_raw, cached_hour = _allowed_hour_cache
+    if raw == cached_raw:
+        return cached_hour
+    try:
+        hour = int(raw) if raw is not None else None
+    except ValueError:
+        hour = None
+    _allowed_hour_cache = (raw, hour)
+    return hour
+
 
 def update_network_usage_learning(bytes_sent: int, bytes_recv: int) -> bool:
     """Atualiza o aprendizado de uso de rede e verifica se excede o limite aprendido."""
     record_network_usage(bytes_sent, bytes_recv)
     limit = get_network_limit()
     total = bytes_sent + bytes_recv
-    allowed_hour = os.environ.get("NETWORK_TREATMENT_ALLOWED_HOUR")
-    current_hour = datetime.datetime.now().hour
+    dt_now = datetime.datetime.now()
+    current_hour = dt_now.hour
     # Persistência do excesso por 5 minutos antes de agir
-    now = datetime.datetime.now().timestamp()
+    now = dt_now.timestamp()
     global _excess_since
     if total > limit:
         if _excess_since is None:
@@ -40,13 +59,8 @@ def update_network_usage_learning(bytes_sent: int, bytes_recv: int) -> bool:
         excess_duration = 0
 
     # Janela horária configurável
-    if allowed_hour is None:
-        return False
-    try:
-        allowed_hour_int = int(allowed_hour)
-    except Exception:
-        allowed_hour_int = None
-    if allowed_hour_int is None or current_hour != allowed_hour_int:
+    allowed_hour = _allowed_hour()
+    if allowed_hour is None or current_hour != allowed_hour:
         return False
 
     # Se excesso persistir por mais de 5min e trava horária ativa, acione tratamento
@@ -83,9 +97,10 @@ def cleanup_temp_files(days: int = 7) -> None:
         logger.debug("cleanup_temp_files: tempdir %s does not exist", tmpdir)
         return
 
+    now_ts = time.time()
     try:
         for item in sorted(tmpdir.iterdir()):
-            process_temp_item(item, max_age)
+            process_temp_item(item, max_age, now_ts=now_ts)
     except OSError as exc:
         # Log de depuração; não propagar erro em varredura de tempdir
         logger.debug("cleanup_temp_files: scanning %s failed: %s", tmpdir, exc, exc_info=True)
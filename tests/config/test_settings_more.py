@@ -63,3 +63,27 @@ def test_load_settings_env_override(monkeypatch, tmp_path):
     assert cfg["log_level"] == "DEBUG"
     # threshold override should apply
     assert float(cfg["thresholds"]["cpu_percent"]["warning"]) == 20.0
+
+
+def test_get_valid_thresholds_cached_until_env_changes(monkeypatch, tmp_path):
+    """Sem settings explícito, o parse é memoizado e devolve cópias independentes."""
+    env_file = tmp_path / ".env"
+    env_file.write_text("MONITORING_THRESHOLD_CPU_PERCENT_WARNING=20")
+    monkeypatch.setenv("MONITORING_ENV_FILE", str(env_file))
+    settings_mod._cached_valid_thresholds.cache_clear()
+
+    calls = []
+    real_load = settings_mod.load_settings
+    monkeypatch.setattr(settings_mod, "load_settings", lambda: calls.append(1) or real_load())
+
+    first = settings_mod.get_valid_thresholds()
+    first["cpu_percent"]["warning"] = -1
+    second = settings_mod.get_valid_thresholds()
+    assert len(calls) == 1
+    assert second["cpu_percent"]["warning"] == 20.0
+
+    monkeypatch.setenv("MONITORING_THRESHOLD_CPU_PERCENT_WARNING", "30")
+    third = settings_mod.get_valid_thresholds()
+    assert len(calls) == 2
+    assert third["cpu_percent"]["warning"] == 20.0  # o .env explícito prevalece
+    settings_mod._cached_valid_thresholds.cache_clear()
@@ -36,3 +36,77 @@ def test_run_loop_one_cycle(monkeypatch):
     monkeypatch.setattr("src.core.core._run_maintenance", lambda now, a, b, c, d, intervals: (a, b, c, d))
 
     core.run_loop(interval=0, cycles=1, verbose_level=0)
+
+
+def test_collect_and_emit_respects_min_critical_alerts(monkeypatch):
+    """Tratamentos só são despachados com o mínimo de alertas críticos simultâneos."""
+    calls = []
+    fake_state = SimpleNamespace(
+        evaluate_metrics=lambda m: "CRITICAL",
+        current_snapshot=None,
+        thresholds={"cpu_percent": {"critical": 90}},
+        critical_alerts=[{"name": "cpu_percent", "value": 95, "level": "CRITICAL"}],
+        min_critical_alerts=2,
+    )
+    monkeypatch.setattr("src.core.core._collect_metrics", lambda: {"cpu_percent": 95})
+    monkeypatch.setattr("src.core.core._emit_snapshot", lambda s, r, v: None)
+    monkeypatch.setattr("src.core.core.attempt_treatment", lambda st, name, d: calls.append((name, d)))
+
+    core._collect_and_emit(fake_state, verbose_level=0)
+    assert calls == []
+    fake_state.min_critical_alerts = 1
+    core._collect_and_emit(fake_state, verbose_level=0)
+    assert calls == [("cpu_percent", {"value": 95, "threshold": 90})]
+
+
+def test_dispatch_treatments_runs_multiple_alerts_in_pool(monkeypatch):
+    """Vários alertas críticos são tratados no pool; um único roda inline."""
+    import threading
+
+    seen = []
+    monkeypatch.setattr(
+        "src.core.core.attempt_treatment", lambda st, name, d: seen.append((name, threading.current_thread().name))
+    )
+    state = SimpleNamespace(sustained_crit_seconds=10)
+    thresholds = {"cpu_percent": {"critical": 90}, "disk_percent": {"critical": 95}}
+
+    core._dispatch_treatments(state, [{"name": "cpu_percent", "value": 99}], thresholds)
+    assert seen == [("cpu_percent", threading.current_thread().name)]
+
+    seen.clear()
+    alerts = [{"name": "cpu_percent", "value": 99}, {"name": "disk_percent", "value": 99}]
+    core._dispatch_treatments(state, alerts, thresholds)
+    assert sorted(name for name, _t in seen) == ["cpu_percent", "disk_percent"]
+    assert all(t.startswith("treat") for _n, t in seen)
+
+
+def test_sustained_critical_runs_treatment_end_to_end(monkeypatch):
+    """CPU crítica sustentada: evaluate_metrics -> attempt_treatment -> ação executada."""
+    from src.monitoring import handlers, state as state_mod
+
+    monkeypatch.delenv("MONITORING_AUTO_TREATMENT", raising=False)
+    st = state_mod.SystemState({"cpu_percent": {"warning": 50, "critical": 90}}, critical_duration=10_000)
+    actions = []
+    monkeypatch.setattr(handlers.treatments, "reap_zombie_processes", lambda: actions.append("reap") or 0)
+    monkeypatch.setattr("src.core.core._collect_metrics", lambda: {"cpu_percent": 95})
+    monkeypatch.setattr("src.core.core._emit_snapshot", lambda s, r, v: None)
+
+    core._collect_and_emit(st, verbose_level=0)
+    assert "cpu_percent" in st.critic_since
+    assert actions == []  # ainda não sustentado
+
+    # 301 s depois (relógio monotônico dos handlers adiantado)
+    real_monotonic = handlers.time.monotonic
+    monkeypatch.setattr(handlers.time, "monotonic", lambda: real_monotonic() + 301)
+    core._collect_and_emit(st, verbose_level=0)
+    assert actions == ["reap"]
+
+
+def test_auto_treatment_disabled_keeps_critic_since_empty(monkeypatch):
+    """MONITORING_AUTO_TREATMENT=0: critic_since fica vazio e nada é tratado."""
+    from src.monitoring import state as state_mod
+
+    monkeypatch.setenv("MONITORING_AUTO_TREATMENT", "0")
+    st = state_mod.SystemState({"cpu_percent": {"critical": 90}}, critical_duration=10_000)
+    st.evaluate_metrics({"cpu_percent": 95})
+    assert st.critical_alerts and st.critic_since == {}
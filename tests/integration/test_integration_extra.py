@@ -5,6 +5,7 @@ import pytest
 from src.system.log_helpers import build_human_line
 from src.system.logs import get_log_paths
 from src.config.settings import load_settings
+from src.monitoring import state as state_mod
 from src.monitoring.state import SystemState
 
 
@@ -33,6 +34,8 @@ def test_threshold_override_accepts_critical(monkeypatch, tmp_path):
 def test_post_treatment_history_written(tmp_path, monkeypatch):
     """Trigger a post-treatment snapshot and verify history file is appended."""
     monkeypatch.setenv("MONITORING_LOG_ROOT", str(tmp_path))
+    hist = tmp_path / ".cache" / state_mod._POST_TREATMENT_FILENAME
+    monkeypatch.setattr(state_mod, "_POST_TREATMENT_HISTORY_PATH", hist)
     thresholds = {"cpu_percent": {"warning": 1.0, "critical": 2.0}}
     st = SystemState(thresholds, critical_duration=0, post_treatment_wait_seconds=0)
 
@@ -42,10 +45,6 @@ def test_post_treatment_history_written(tmp_path, monkeypatch):
     # wait for background worker to run
     time.sleep(0.5)
 
-    from pathlib import Path
-
-    project_root = Path(__file__).resolve().parents[2]
-    hist = project_root / ".cache" / "post_treatment_history.jsonl"
     assert hist.exists(), f"history file not found: {hist}"
     # ensure at least one line is JSON
     with hist.open("r", encoding="utf-8") as fh:
@@ -62,6 +61,8 @@ def test_post_treatment_emitted_to_monitoring_feed(tmp_path, monkeypatch):
     contain 'alerts' and should NOT include 'summary_short'/'summary_long'.
     """
     monkeypatch.setenv("MONITORING_LOG_ROOT", str(tmp_path))
+    hist = tmp_path / ".cache" / state_mod._POST_TREATMENT_FILENAME
+    monkeypatch.setattr(state_mod, "_POST_TREATMENT_HISTORY_PATH", hist)
     thresholds = {"cpu_percent": {"warning": 1.0, "critical": 2.0}}
     st = SystemState(thresholds, critical_duration=0, post_treatment_wait_seconds=0)
 
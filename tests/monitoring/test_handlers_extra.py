@@ -111,3 +111,18 @@ def test_attempt_treatment_noop():
     details = {}
     result = handlers.attempt_treatment(state, name, details)
     assert result is False or isinstance(result, dict)
+
+
+def test_attempt_treatment_skips_action_already_running(monkeypatch):
+    """A mesma ação não roda em paralelo: com o lock ocupado, retorna False."""
+
+    class S:
+        critic_since = {"disk_percent": time.monotonic() - 1000}
+        sustained_critic_seconds = 1
+        treatment_cooldowns: dict = {}
+        last_treatment_run: dict = {}
+
+    monkeypatch.setattr(handlers.treatments, "check_disk_usage", lambda *a: {"ok": True}, raising=False)
+    lock = handlers._action_lock("check_disk_usage")
+    with lock:
+        assert handlers.attempt_treatment(S(), "disk_percent", {}) is False
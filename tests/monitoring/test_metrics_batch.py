@@ -141,3 +141,26 @@ def test_get_memory_and_disk_info(monkeypatch):
     monkeypatch.setattr(metrics.psutil, "disk_usage", lambda p: SimpleNamespace(used=300, total=1000))
     used, total = metrics.get_disk_usage_info(None)
     assert used == 300 and total == 1000
+
+
+def test_parse_ping_output_for_ms():
+    """Teste para o parser de saída do ping (regex pré-compilada)."""
+    out = "64 bytes from 8.8.8.8: icmp_seq=1 ttl=117 time=12.7 ms"
+    assert metrics._parse_ping_output_for_ms(out) == 12.7
+    assert metrics._parse_ping_output_for_ms("Resposta de 8.8.8.8: bytes=32 tempo=9ms TTL=117") == 9.0
+    assert metrics._parse_ping_output_for_ms("Request timed out.") is None
+    assert metrics._parse_ping_output_for_ms("time=1.2.3 ms") is None
+
+
+def test_scan_ping_ms_matches_regex():
+    """A varredura manual concorda com a regex em saídas típicas de ping."""
+    samples = [
+        "64 bytes from 8.8.8.8: icmp_seq=1 ttl=117 time=12.7 ms\n\nrtt min/avg/max/mdev = 12.7/12.7/12.7/0.000 ms",
+        "Reply from 8.8.8.8: bytes=32 time=15ms TTL=117",
+        "PING ms.example.com: time = 3.5  ms",
+        "Request timed out.",
+        "",
+    ]
+    for out in samples:
+        m = metrics._PING_MS_RE.search(out)
+        assert metrics._scan_ping_ms(out) == (m.group(1) if m else None)
@@ -39,3 +39,218 @@ def test_prepare_post_treatment_and_record(monkeypatch, tmp_path):
     for i in range(15):
         s._record_post_treatment_snapshot({"idx": i})
     assert len(s.post_treatment_history) <= 10
+
+
+def test_evaluate_against_thresholds_prefers_critical_and_skips_invalid():
+    """Critical wins over an earlier warning; non-numeric limits are dropped at indexing."""
+    s = state.SystemState(
+        {
+            "cpu_percent": {"warning": 10, "critical": 90},
+            "ping_ms": {"warning": 50, "critical": 100},
+            "temperature": {"warning": "hot", "critical": None},
+        },
+        post_treatment_wait_seconds=0,
+    )
+    assert [name for name, _w, _c in s._threshold_vec] == ["cpu_percent", "ping_ms"]
+    assert s._evaluate_against_thresholds({"cpu_percent": 20, "ping_ms": 150}) == state.STATE_CRITICAL
+    assert s._evaluate_against_thresholds({"cpu_percent": 20, "temperature": 99}) == state.STATE_WARNING
+    assert s._evaluate_against_thresholds({"cpu_percent": None}) == state.STATE_STABLE
+
+
+def test_prepare_post_treatment_skips_summaries(monkeypatch):
+    """Post-treatment snapshots never run the display formatter."""
+    s = state.SystemState({}, post_treatment_wait_seconds=0)
+
+    def boom(_metrics):
+        raise AssertionError("formatter should not be called")
+
+    monkeypatch.setattr(state, "_normalize_for_display", boom)
+    snap = s._prepare_post_treatment_snapshot({"cpu_percent": 5}, [])
+    assert "summary_short" not in snap and "summary_long" not in snap
+    assert snap["post_treatment"] is True
+
+
+def test_compute_metric_states_batch_matches_scalar():
+    """Batch classification returns the same per-sample result as the scalar wrapper."""
+    thresholds = {"cpu_percent": {"warning": 50, "critical": 90}, "ping_ms": {"warning": 100, "critical": 500}}
+    samples = [{"cpu_percent": 10}, {"cpu_percent": 95, "ping_ms": 120}, {}, {"ping_ms": "n/a"}]
+    batch = state.compute_metric_states_batch(samples, thresholds)
+    assert batch == [state.compute_metric_states(m, thresholds) for m in samples]
+    assert state.compute_metric_states_batch([{}], {}) == [{}]
+
+
+def test_record_and_write_snapshot_skips_unchanged(monkeypatch):
+    """Identical post-treatment content (different timestamp) is written only once."""
+    s = state.SystemState({}, post_treatment_wait_seconds=0)
+    writes = []
+    history = []
+    monkeypatch.setattr(s, "_write_post_treatment_primary", lambda snap: writes.append(snap))
+    monkeypatch.setattr(s, "_append_post_treatment_history", lambda snap: history.append(snap) or True)
+
+    s._record_and_write_snapshot({"state": "post_treatment", "timestamp": "t1", "metrics": {"cpu_percent": 5}})
+    s._record_and_write_snapshot({"state": "post_treatment", "timestamp": "t2", "metrics": {"cpu_percent": 5}})
+    assert len(writes) == 1
+    assert history == []  # o histórico em .cache é escrito só pelo escritor primário
+    assert s.post_treatment_snapshot["timestamp"] == "t2"
+    s._record_and_write_snapshot({"state": "post_treatment", "timestamp": "t3", "metrics": {"cpu_percent": 6}})
+    assert len(writes) == 2
+
+
+def test_policies_are_memoized_per_settings_key(monkeypatch):
+    """Teste: `load_settings` só é relido quando a chave de configuração muda."""
+    calls = []
+
+    def fake_load():
+        calls.append(1)
+        return {"treatment_policies": {"sustained_crit_seconds": 7}}
+
+    monkeypatch.setattr(state, "load_settings", fake_load)
+    state._load_policies.cache_clear()
+    monkeypatch.setenv("MONITORING_TEST_POLICY_KEY", "a")
+    s1 = state.SystemState({})
+    s2 = state.SystemState({})
+    assert len(calls) == 1
+    assert s1.sustained_crit_seconds == s2.sustained_crit_seconds == 7
+    monkeypatch.setenv("MONITORING_TEST_POLICY_KEY", "b")
+    state.SystemState({})
+    assert len(calls) == 2
+    state._load_policies.cache_clear()
+
+
+def test_set_thresholds_rebuilds_vector_and_alerts():
+    """set_thresholds reindexa os limites usados por avaliação e alertas."""
+    s = state.SystemState({}, post_treatment_wait_seconds=0)
+    assert s._evaluate_against_thresholds({"cpu_percent": 99}) == state.STATE_STABLE
+    s.set_thresholds({"cpu_percent": {"warning": 50, "critic": 90}, "ping_ms": {"warning": 10}})
+    assert s._evaluate_against_thresholds({"cpu_percent": 99}) == state.STATE_CRITICAL
+    alerts = s._compute_alerts({"cpu_percent": 60, "ping_ms": "x"})
+    assert alerts == [{"name": "cpu_percent", "value": 60, "level": state.STATE_WARNING}]
+
+
+def test_canonical_state_returns_interned_constants():
+    """Estados são normalizados para as constantes internadas (comparáveis com `is`)."""
+    assert state._canonical_state("critical") is state.STATE_CRITICAL
+    assert state._canonical_state("".join(["WARN", "ING"])) is state.STATE_WARNING
+    assert state._canonical_state("weird") == "WEIRD"
+    assert state._canonical_state(None) is None
+
+
+def test_iso_utc_matches_datetime_isoformat():
+    """_iso_utc produz o mesmo texto que datetime.isoformat (com microssegundos)."""
+    from datetime import datetime, timezone
+
+    for ts in (1_700_000_000.123456, 1_700_000_000.5, 1_700_000_000.9999999):
+        expected = datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="microseconds")
+        assert state._iso_utc(ts) == expected
+
+
+def test_evaluate_metrics_skips_network_learning_without_net_thresholds(monkeypatch):
+    """Sem thresholds de rede o handler de aprendizado não é instanciado."""
+    import src.system.network_learning as nl
+
+    calls = []
+    monkeypatch.setattr(nl, "NetworkUsageLearningHandler", lambda *a, **kw: calls.append(1))
+    s = state.SystemState({}, post_treatment_wait_seconds=0)
+    assert s.evaluate_metrics({"cpu_percent": 99}) == state.STATE_STABLE
+    assert calls == []
+
+
+def test_normalize_for_display_reads_published_view():
+    """normalize_for_display reflete a visão publicada por _update_snapshots."""
+    s = state.SystemState({"cpu_percent": {"warning": 50, "critical": 90}}, post_treatment_wait_seconds=0)
+    assert s.normalize_for_display() == {"current": {}, "last_state": state.STATE_STABLE}
+    s.evaluate_metrics({"cpu_percent": 60})
+    view = s.normalize_for_display()
+    assert view["last_state"] == state.STATE_WARNING
+    assert view["current"] is s.current_snapshot
+
+
+def test_submit_post_treatment_reuses_single_worker():
+    """Jobs de pós-tratamento rodam em uma única thread de longa duração."""
+    import threading
+
+    done = threading.Event()
+    names = []
+
+    def job(metrics):
+        names.append((threading.current_thread().name, metrics["i"]))
+        if metrics["i"] == 1:
+            done.set()
+
+    state._submit_post_treatment(job, {"i": 0})
+    first = state._post_treatment_thread
+    state._submit_post_treatment(job, {"i": 1})
+    assert done.wait(2.0)
+    assert state._post_treatment_thread is first
+    assert names == [("post-treat", 0), ("post-treat", 1)]
+
+
+def test_build_snapshot_reuses_summaries_for_equal_metrics(monkeypatch):
+    """Métricas iguais entre ticks não reexecutam o formatter."""
+    calls = []
+
+    def fake_normalize(m):
+        calls.append(dict(m))
+        return {"summary_short": f"s{len(calls)}", "summary_long": "l"}
+
+    monkeypatch.setattr(state, "_normalize_for_display", fake_normalize)
+    s = state.SystemState({}, post_treatment_wait_seconds=0)
+    m = {"cpu_percent": 1}
+    a = s._build_snapshot(state.STATE_STABLE, m)
+    b = s._build_snapshot(state.STATE_STABLE, {"cpu_percent": 1})
+    assert len(calls) == 1 and a["summary_short"] == b["summary_short"] == "s1"
+    m["cpu_percent"] = 2  # mutação in-place invalida o cache
+    c = s._build_snapshot(state.STATE_STABLE, m)
+    assert len(calls) == 2 and c["summary_short"] == "s2"
+
+
+def test_evaluate_metrics_reuses_state_for_equal_metrics(monkeypatch):
+    """Métricas iguais com os mesmos thresholds não refazem a varredura."""
+    s = state.SystemState({"cpu_percent": {"warning": 50, "critical": 90}}, post_treatment_wait_seconds=0)
+    calls = []
+    real = s._scan_thresholds
+    monkeypatch.setattr(s, "_scan_thresholds", lambda m: calls.append(1) or real(m))
+    assert s.evaluate_metrics({"cpu_percent": 60}) == state.STATE_WARNING
+    assert s.evaluate_metrics({"cpu_percent": 60}) == state.STATE_WARNING
+    assert len(calls) == 1
+    s.set_thresholds({"cpu_percent": {"warning": 70, "critical": 90}})
+    assert s.evaluate_metrics({"cpu_percent": 60}) == state.STATE_STABLE
+    assert len(calls) == 2
+
+
+def test_evaluate_metrics_exposes_last_alerts():
+    """evaluate_metrics publica os alertas da mesma passada que define o estado."""
+    s = state.SystemState(
+        {"cpu_percent": {"warning": 50, "critical": 90}, "ping_ms": {"warning": 10}},
+        post_treatment_wait_seconds=0,
+    )
+    assert s.evaluate_metrics({"cpu_percent": 95, "ping_ms": 20}) == state.STATE_CRITICAL
+    assert s.last_alerts == [
+        {"name": "cpu_percent", "value": 95, "level": state.STATE_CRITICAL},
+        {"name": "ping_ms", "value": 20, "level": state.STATE_WARNING},
+    ]
+    s.evaluate_metrics({"cpu_percent": 1})
+    assert s.last_alerts == []
+
+
+def test_compute_alerts_shares_list_from_last_evaluation(monkeypatch):
+    """_compute_alerts reaproveita os alertas da última avaliação com as mesmas métricas."""
+    s = state.SystemState({"cpu_percent": {"warning": 50, "critical": 90}}, post_treatment_wait_seconds=0)
+    s.evaluate_metrics({"cpu_percent": 95})
+    monkeypatch.setattr(s, "_scan_thresholds", lambda m: (_ for _ in ()).throw(AssertionError("rescan")))
+    assert s._compute_alerts({"cpu_percent": 95}) is s.last_alerts
+
+
+def test_evaluate_metrics_filters_critical_alerts_once():
+    """critical_alerts é o subconjunto crítico de last_alerts, recalculado por avaliação."""
+    s = state.SystemState(
+        {"cpu_percent": {"warning": 50, "critical": 90}, "disk_percent": {"critical": 90}},
+        post_treatment_wait_seconds=0,
+    )
+    s.evaluate_metrics({"cpu_percent": 95, "disk_percent": 95})
+    assert [a["name"] for a in s.critical_alerts] == ["cpu_percent", "disk_percent"]
+    s.evaluate_metrics({"cpu_percent": 96, "disk_percent": 10})
+    assert [a["name"] for a in s.critical_alerts] == ["cpu_percent"]
+    s.evaluate_metrics({"cpu_percent": 60})
+    assert s.critical_alerts == []
+    assert s.critic_since == {}
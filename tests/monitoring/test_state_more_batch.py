@@ -1,3 +1,5 @@
+from collections import deque
+
 from src.monitoring import state as s
 
 
@@ -34,6 +36,7 @@ def test_systemstate_evaluate_and_snapshot(monkeypatch, tmp_path):
 def test_activation_and_post_treatment(monkeypatch, tmp_path):
     """Testa ativação e pós-tratamento em SystemState."""
     # create SystemState with tiny sustained_crit_seconds so activation triggers
+    monkeypatch.setenv("MONITORING_SYNC_POST_TREATMENT", "1")
     thr = {"cpu_percent": {"warning": 50, "critical": 10}}
     ss = s.SystemState(thr, critical_duration=0, post_treatment_wait_seconds=0)
 
@@ -47,9 +50,10 @@ def test_activation_and_post_treatment(monkeypatch, tmp_path):
     ss._activate_treatment({"cpu_percent": 99})
 
     # Ensure post_treatment_history updated
-    # worker runs synchronously in _activate_treatment, so history should be present
-    assert isinstance(ss.post_treatment_history, list)
-    assert len(ss.post_treatment_history) >= 1
+    # sync mode runs the worker inline in _activate_treatment, so history should be present
+    assert isinstance(ss.post_treatment_history, deque)
+    assert len(ss.post_treatment_history) == 1
+    assert ss.treatment_active is False
 
 
 def test_safe_collect_handles_errors(monkeypatch):
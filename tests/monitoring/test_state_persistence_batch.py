@@ -8,6 +8,7 @@ def test_write_post_treatment_primary(monkeypatch, tmp_path):
     """Teste para escrita primária de pós-tratamento."""
     """Teste para escrita primária de pós-tratamento."""
     ss = st.SystemState({}, critical_duration=1, post_treatment_wait_seconds=0)
+    monkeypatch.setattr(st, "_POST_TREATMENT_HISTORY_PATH", tmp_path / ".cache" / st._POST_TREATMENT_FILENAME)
 
     # fake log paths object
     lp = SimpleNamespace(
@@ -35,24 +36,22 @@ def test_write_post_treatment_fallback(monkeypatch, tmp_path):
     """Teste para fallback de escrita de pós-tratamento."""
     """Teste para fallback de escrita de pós-tratamento."""
     ss = st.SystemState({}, critical_duration=1, post_treatment_wait_seconds=0)
+    monkeypatch.setattr(st, "_POST_TREATMENT_HISTORY_PATH", tmp_path / ".cache" / st._POST_TREATMENT_FILENAME)
 
     # ensure MONITORING_LOG_ROOT is set to tmp_path
     monkeypatch.setenv("MONITORING_LOG_ROOT", str(tmp_path))
 
     snap = {"state": "post_treatment", "metrics": {}}
-    # call fallback; agora só cria em .cache na raiz do projeto
+    # call fallback; só grava o histórico em .cache
     ss._write_post_treatment_fallback(snap)
-    from pathlib import Path
-
-    project_root = Path(__file__).resolve().parents[2]
-    cache_file = project_root / ".cache" / st._POST_TREATMENT_FILENAME
-    assert cache_file.exists()
+    assert (tmp_path / ".cache" / st._POST_TREATMENT_FILENAME).exists()
 
 
 def test_persist_post_treatment_snapshot_fallback(monkeypatch, tmp_path):
     """Teste para persistência de snapshot pós-tratamento com fallback."""
     """Teste para persistência de snapshot pós-tratamento com fallback."""
     ss = st.SystemState({}, critical_duration=1, post_treatment_wait_seconds=0)
+    monkeypatch.setattr(st, "_POST_TREATMENT_HISTORY_PATH", tmp_path / ".cache" / st._POST_TREATMENT_FILENAME)
 
     # monkeypatch get_log_paths to return a path under tmp_path
     lp = SimpleNamespace(cache_dir=tmp_path / ".cache")  # Mantido para compatibilidade
@@ -79,3 +78,19 @@ def test_persist_post_treatment_snapshot_fallback(monkeypatch, tmp_path):
     ss._persist_post_treatment_snapshot(snap)
     # if fallback path used, captured will contain one entry
     assert isinstance(captured, list)
+
+
+def test_write_post_treatment_primary_entry_keeps_base_keys(monkeypatch, tmp_path):
+    """A entrada do feed começa com ts/level/msg e o snapshot não os sobrescreve."""
+    ss = st.SystemState({}, critical_duration=1, post_treatment_wait_seconds=0)
+    monkeypatch.setattr(st, "_POST_TREATMENT_HISTORY_PATH", tmp_path / ".cache" / st._POST_TREATMENT_FILENAME)
+    monkeypatch.setattr("src.system.logs.get_log_paths", lambda: SimpleNamespace(json_dir=tmp_path / "json"))
+    written = []
+    monkeypatch.setattr("src.system.log_helpers.write_json", lambda p, obj: written.append(obj))
+
+    snap = {"state": "post_treatment", "timestamp": "T0", "msg": "override?", "metrics": {}}
+    ss._write_post_treatment_primary(snap)
+    entry = written[-1]
+    assert list(entry)[:3] == ["ts", "level", "msg"]
+    assert entry["ts"] == "T0" and entry["msg"] == "post_treatment"
+    assert entry["state"] == "post_treatment" and entry["metrics"] == {}
@@ -192,7 +192,6 @@ def test_atomic_move_cleanup_when_dst_exists(tmp_path, monkeypatch):
     archive.mkdir()
     dst = archive / (s.name + mod.ROTATING_SUFFIX)
     dst.write_text("old")
-    monkeypatch.setattr(mod, "_attempt_rename", lambda a, b: False)
     monkeypatch.setattr(mod, "_attempt_replace", lambda a, b: False)
     monkeypatch.setattr(mod, "_copy_replace_fallback", lambda a, b: False)
     s.unlink()
@@ -208,7 +207,6 @@ def test_atomic_move_backoff_and_cleanup(tmp_path, monkeypatch):
     archive = tmp_path / "archive"
     archive.mkdir()
     dst = archive / (s.name + mod.ROTATING_SUFFIX)
-    monkeypatch.setattr(mod, "_attempt_rename", lambda a, b: False)
     monkeypatch.setattr(mod, "_attempt_replace", lambda a, b: False)
     monkeypatch.setattr(mod, "_copy_replace_fallback", lambda a, b: False)
     assert mod.atomic_move_to_archive(s, dst) is False
@@ -57,6 +57,10 @@ def test_validate_host_port():
     assert not validate_host_port("not-an-ip", 80)
     assert not validate_host_port("127.0.0.1", 0)
     assert not validate_host_port("127.0.0.1", 65536)
+    assert validate_host_port("::1", 53)
+    assert validate_host_port("2001:4860:4860::8888", 53)
+    assert not validate_host_port("1.2.3", 80)
+    assert not validate_host_port("127.0.0.1", "80")
 
 
 def test_disk_candidate_paths_smoke():
@@ -81,8 +85,115 @@ def test_reap_children_nonblocking_smoke():
     assert isinstance(res, list)
 
 
+def test_reap_children_nonblocking_collects_exited_child(monkeypatch):
+    """Filhos já terminados são recolhidos até waitpid devolver pid 0."""
+    import src.system.helpers as helpers
+
+    results = iter([(101, 0), (102, 256), (0, 0)])
+    monkeypatch.setattr(helpers.os, "name", "posix")
+    monkeypatch.setattr(helpers.os, "waitpid", lambda pid, flags: next(results))
+    assert helpers.reap_children_nonblocking() == [(101, 0), (102, 256)]
+
+
 def test_import_helpers():
     """Importa o módulo de helpers do sistema sem erros."""
     import src.system.helpers as helpers
 
     assert helpers is not None
+
+
+def test_read_jsonl_cache_parses_only_appended_lines(tmp_path, monkeypatch):
+    """read_jsonl(cache=True) só decodifica a cauda nova e detecta reescritas."""
+    import os
+
+    import src.system.helpers as helpers
+
+    p = tmp_path / "m.jsonl"
+    p.write_text('{"a": 1}\n{"a": 2}\n', encoding="utf-8")
+    assert helpers.read_jsonl(p, cache=True) == [{"a": 1}, {"a": 2}]
+
+    parsed = []
+    real = helpers._parse_jsonl_bytes
+    monkeypatch.setattr(helpers, "_parse_jsonl_bytes", lambda data, out: parsed.append(data) or real(data, out))
+    assert helpers.read_jsonl(p, cache=True) == [{"a": 1}, {"a": 2}]
+    assert parsed == []
+
+    with p.open("a", encoding="utf-8") as fh:
+        fh.write('{"a": 3}\n{"a": 4')
+    assert helpers.read_jsonl(p, cache=True) == [{"a": 1}, {"a": 2}, {"a": 3}]
+    assert b'"a": 1' not in b"".join(parsed)
+
+    # reescrita maior que o original (mesmo inode): relê do início
+    p.write_text('{"b": 1}\n{"b": 2}\n{"b": 3}\n', encoding="utf-8")
+    st = os.stat(p)
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert helpers.read_jsonl(p, cache=True) == [{"b": 1}, {"b": 2}, {"b": 3}]
+    assert helpers.read_jsonl(tmp_path / "missing.jsonl", cache=True) == []
+
+
+def test_read_env_file_and_network_limit_cached_by_mtime(tmp_path, monkeypatch):
+    """.env e limite de rede só são reprocessados quando o arquivo muda."""
+    import os
+
+    import src.system.helpers as helpers
+
+    env = tmp_path / ".env"
+    env.write_text("A=1\n", encoding="utf-8")
+    first = helpers.read_env_file(env)
+    first["A"] = "mutated"
+    assert helpers.read_env_file(env) == {"A": "1"}
+    env.write_text("A=22\n", encoding="utf-8")
+    assert helpers.read_env_file(env) == {"A": "22"}
+
+    learn = tmp_path / "net.jsonl"
+    monkeypatch.setattr(helpers, "NETWORK_LEARNING_FILE", learn)
+    assert helpers.get_network_limit() == helpers.NETWORK_DEFAULT_LIMIT
+    learn.write_text('{"date": "2024-01-01", "bytes_sent": 1, "bytes_recv": 1}\n', encoding="utf-8")
+    calls = []
+    real = helpers._network_limit_from_usage
+    monkeypatch.setattr(helpers, "_network_limit_from_usage", lambda d: calls.append(1) or real(d))
+    assert helpers.get_network_limit() == helpers.get_network_limit() == helpers.NETWORK_DEFAULT_LIMIT
+    assert len(calls) == 1
+    days = ("2024-01-01", "2024-01-08", "2024-01-15", "2024-01-22")
+    learn.write_text(
+        "".join(f'{{"date": "{d}", "bytes_sent": 50, "bytes_recv": 50}}\n' for d in days), encoding="utf-8"
+    )
+    st = os.stat(learn)
+    os.utime(learn, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert helpers.get_network_limit() == 120
+
+
+def test_record_network_usage_appends_and_compacts(tmp_path, monkeypatch):
+    """Cada amostra é acrescentada; a compactação deixa uma linha por data."""
+    import json
+
+    import src.system.helpers as helpers
+
+    learn = tmp_path / "net.jsonl"
+    legacy = tmp_path / "net.json"
+    legacy.write_text(json.dumps({"2024-01-01": {"bytes_sent": 5, "bytes_recv": 5}}), encoding="utf-8")
+    monkeypatch.setattr(helpers, "NETWORK_LEARNING_FILE", learn)
+    monkeypatch.setattr(helpers, "_LEGACY_NETWORK_LEARNING_FILE", legacy)
+
+    helpers.record_network_usage(1, 2)
+    helpers.record_network_usage(3, 4)
+    lines = learn.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3 and json.loads(lines[0])["date"] == "2024-01-01"
+    assert json.loads(lines[-1])["bytes_sent"] == 3
+
+    monkeypatch.setattr(helpers, "_NETWORK_COMPACT_BYTES", 1)
+    helpers.record_network_usage(7, 8)
+    rows = [json.loads(ln) for ln in learn.read_text(encoding="utf-8").splitlines()]
+    assert len(rows) == 2 and rows[-1]["bytes_sent"] == 7
+
+
+def test_read_jsonl_large_file_uses_mmap(tmp_path, monkeypatch):
+    """Arquivos grandes são lidos via mmap com o mesmo resultado da leitura por linhas."""
+    import src.system.helpers as helpers
+
+    p = tmp_path / "big.jsonl"
+    p.write_text('{"i": 1}\n\nnot json\n{"i": 2}', encoding="utf-8")
+    expected = helpers.read_jsonl(p)
+    monkeypatch.setattr(helpers, "_JSONL_MMAP_MIN_BYTES", 1)
+    assert helpers._read_jsonl_mmap(p) == expected == [{"i": 1}, {"i": 2}]
+    assert helpers.read_jsonl(p) == expected
@@ -45,3 +45,38 @@ def test_iter_jsonl_missing(tmp_path):
 
     with pytest.raises(FileNotFoundError):
         next(iter_jsonl(p))
+
+
+def test_iter_jsonl_splits_lines_across_chunks(tmp_path, monkeypatch):
+    r"""Linhas que cruzam a fronteira de blocos e a última linha sem '\n' são lidas."""
+    import src.system.ingest as ingest
+
+    monkeypatch.setattr(ingest, "_CHUNK_SIZE", 5)
+    p = tmp_path / "chunks.jsonl"
+    p.write_bytes(b'{"a": 1}\n{"long": "' + b"x" * 20 + b'"}\n\xff\xfe\n{"z": 3}')
+
+    items = list(ingest.iter_jsonl(p, max_retries=0))
+    assert items == [{"a": 1}, {"long": "x" * 20}, {"z": 3}]
+
+
+def test_iter_jsonl_replaces_invalid_utf8(tmp_path):
+    """Bytes UTF-8 inválidos viram U+FFFD em vez de descartar o registro."""
+    from src.system.ingest import iter_jsonl
+
+    p = tmp_path / "latin1.jsonl"
+    p.write_bytes(b'{"a": "caf\xe9"}\n{"b": "caf\xe9"}')
+
+    items = list(iter_jsonl(p, max_retries=0))
+    assert items == [{"a": "caf\ufffd"}, {"b": "caf\ufffd"}]
+
+
+def test_iter_jsonl_follow_yields_complete_lines(tmp_path):
+    """Em follow, linhas completas são entregues sem esperar o fim do arquivo."""
+    from src.system.ingest import iter_jsonl
+
+    p = tmp_path / "follow.jsonl"
+    _write_text(p, '{"a": 1}\n{"b": 2}\n{"parcial"')
+    gen = iter_jsonl(p, follow=True, retry_delay=0.01)
+    assert next(gen) == {"a": 1}
+    assert next(gen) == {"b": 2}
+    gen.close()
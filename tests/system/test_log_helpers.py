@@ -173,3 +173,442 @@ def test_is_older_than_and_ensure_dir_writable(tmp_path):
     assert ensure_dir_writable(tmp_path)
     # Recent file should not be older than large seconds
     assert not is_older_than(f, 9999999)
+
+
+def test_jsonl_appender_reuses_and_reopens_handle(tmp_path):
+    """JsonlAppender reaproveita o handle e reabre se o ficheiro for removido."""
+    import json
+
+    from src.system.log_helpers import JsonlAppender
+
+    app = JsonlAppender()
+    p = tmp_path / "sub" / "hist.jsonl"
+    assert app.append_json(p, {"a": 1})
+    fh = app._handles[p]
+    assert app.append_json(p, {"a": 2})
+    assert app._handles[p] is fh
+    assert [json.loads(x)["a"] for x in p.read_text(encoding="utf-8").splitlines()] == [1, 2]
+
+    os.remove(p)
+    assert app.append_json(p, {"a": 3})
+    assert app._handles[p] is not fh
+    assert [json.loads(x) for x in p.read_text(encoding="utf-8").splitlines()] == [{"a": 3}]
+    app.close_all()
+    assert not app._handles
+
+
+def test_jsonl_appender_falls_back_without_orjson(tmp_path, monkeypatch):
+    """Sem orjson (ou com tipos que ele rejeita) usa a serialização stdlib."""
+    import json
+
+    from src.system import log_helpers as lh
+
+    app = lh.JsonlAppender()
+    p = tmp_path / "h.jsonl"
+    assert app.append_json(p, {1: "int-key"})
+    monkeypatch.setattr(lh, "orjson", None)
+    assert app.append_json(p, {"b": 2})
+    app.close_all()
+    assert [json.loads(x) for x in p.read_text(encoding="utf-8").splitlines()] == [{"1": "int-key"}, {"b": 2}]
+
+
+def test_jsonl_appender_batches_fsync(tmp_path, monkeypatch):
+    """Com fsync_every=N, fsync ocorre a cada N escritas e ao fechar."""
+    from src.system import log_helpers as lh
+
+    synced = []
+    monkeypatch.setattr(lh, "DURABLE_WRITES", True)
+    monkeypatch.setattr(lh, "_fsync", lambda fd: synced.append(fd))
+    app = lh.JsonlAppender(fsync_every=3)
+    p = tmp_path / "h.jsonl"
+    for i in range(4):
+        assert app.append_json(p, {"i": i})
+    assert len(synced) == 1
+    app.close_all()
+    assert len(synced) == 2
+
+
+def test_json_loads_matches_stdlib_and_accepts_nan():
+    """json_loads decodifica str/bytes como o stdlib, inclusive NaN, e levanta JSONDecodeError."""
+    import json
+    import math
+
+    import pytest
+
+    from src.system.log_helpers import json_loads
+
+    assert json_loads('{"a": [1, 2.5, "x"]}') == json_loads(b'{"a": [1, 2.5, "x"]}') == {"a": [1, 2.5, "x"]}
+    assert math.isnan(json_loads('{"v": NaN}')["v"])
+    with pytest.raises(json.JSONDecodeError):
+        json_loads('{"a": 1')
+
+
+def test_compress_file_roundtrip_across_chunks(tmp_path, monkeypatch):
+    """compress_file gera gzip válido mesmo quando o conteúdo ocupa vários blocos."""
+    import gzip
+
+    import src.system.log_helpers as lh
+
+    monkeypatch.setattr(lh, "_COMPRESS_CHUNK", 7)
+    src = tmp_path / "a.log"
+    payload = b"linha de log\n" * 50
+    src.write_bytes(payload)
+    dst = tmp_path / "a.log.gz"
+    assert lh.compress_file(src, dst) is True
+    assert gzip.decompress(dst.read_bytes()) == payload
+
+
+def test_batch_writer_coalesces_per_path(tmp_path, monkeypatch):
+    """_BatchWriter junta as linhas pendentes de cada caminho num único append."""
+    import src.system.log_helpers as lh
+
+    calls = []
+    monkeypatch.setattr(lh, "_write_text_now", lambda p, text: calls.append((p, text)) or True)
+    w = lh._BatchWriter(interval=60)
+    a, b = tmp_path / "a.log", tmp_path / "b.log"
+    assert w.submit(a, "1\n") and w.submit(b, "x\n") and w.submit(a, "2\n")
+    w.flush()
+    assert sorted(calls) == [(a, "1\n2\n"), (b, "x\n")]
+    w.close()
+    w.submit(a, "3\n")  # após close grava direto
+    assert calls[-1] == (a, "3\n")
+
+
+def test_write_text_enqueues_when_async(tmp_path, monkeypatch):
+    """Com ASYNC_WRITES, write_text só enfileira; flush grava no disco."""
+    import src.system.log_helpers as lh
+
+    w = lh._BatchWriter(interval=60)
+    monkeypatch.setattr(lh, "ASYNC_WRITES", True)
+    monkeypatch.setattr(lh, "_BATCH_WRITER", w)
+    p = tmp_path / "q.log"
+    assert lh.write_text(p, "a\n") is True
+    assert not p.exists()
+    w.close()
+    assert p.read_text(encoding="utf-8") == "a\n"
+
+
+def test_build_human_line_flattens_extras_and_message():
+    r"""Extras e mensagem não-str têm \n/\r trocados por espaço numa linha só."""
+    from src.system.log_helpers import build_human_line, normalize_message_for_human
+
+    line = build_human_line("T", "INFO", 42, {"a": "x\ny", "b": [1, 2], "c": "r\rs"})
+    assert line == "T [INFO] a=x y b=[1, 2] c=r s 42\n"
+    assert build_human_line("T", "INFO", "m", {}) == "T [INFO] m\n"
+    assert normalize_message_for_human("a\r\nb") == "a  b"
+
+
+def test_commit_coordinator_shares_writes_between_threads(tmp_path, monkeypatch):
+    """Escritas duráveis concorrentes são agrupadas num número menor de appends."""
+    import threading
+
+    import src.system.log_helpers as lh
+
+    calls = []
+    real = lh._write_text_now
+
+    def slow_write(path, text):
+        calls.append(text)
+        time.sleep(0.02)
+        return real(path, text)
+
+    monkeypatch.setattr(lh, "_write_text_now", slow_write)
+    monkeypatch.setattr(lh, "DURABLE_WRITES", True)
+    monkeypatch.setattr(lh, "ASYNC_WRITES", False)
+    p = tmp_path / "group.log"
+    coordinator = lh._CommitCoordinator()
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(coordinator.commit(p, f"l{i}\n"))) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [True] * 8
+    assert len(calls) < 8
+    assert sorted(p.read_text().splitlines()) == sorted(f"l{i}" for i in range(8))
+
+
+def test_write_text_dsync_skips_fsync(tmp_path, monkeypatch):
+    """Com LOGS_DSYNC_WRITES o ficheiro é aberto com O_DSYNC e não há fsync separado."""
+    import pytest
+
+    import src.system.log_helpers as lh
+
+    if not lh._O_DSYNC:
+        pytest.skip("O_DSYNC indisponível nesta plataforma")
+    synced = []
+    monkeypatch.setattr(lh, "DURABLE_WRITES", True)
+    monkeypatch.setattr(lh, "DSYNC_WRITES", True)
+    monkeypatch.setattr(lh, "ASYNC_WRITES", False)
+    monkeypatch.setattr(lh, "_fsync", lambda fd: synced.append(fd))
+    p = tmp_path / "sub" / "d.log"
+    assert lh.write_text(p, "ação\n") is True
+    assert lh.write_text(p, "b\n") is True
+    assert p.read_text(encoding="utf-8") == "ação\nb\n"
+    assert synced == []
+
+
+def test_periodic_sync_marks_and_syncs_paths(tmp_path, monkeypatch):
+    """No modo periodic, write_text só marca o caminho e o syncer faz o fsync depois."""
+    import src.system.log_helpers as lh
+
+    synced = []
+    syncer = lh._PeriodicSyncer(3600)
+    monkeypatch.setattr(syncer, "_thread", object())  # sem thread de fundo no teste
+    monkeypatch.setattr(lh, "_SYNCER", syncer)
+    monkeypatch.setattr(lh, "DURABLE_WRITES", False)
+    monkeypatch.setattr(lh, "PERIODIC_SYNC", True)
+    monkeypatch.setattr(lh, "ASYNC_WRITES", False)
+    monkeypatch.setattr(lh, "_fsync", lambda fd: synced.append(fd))
+    p = tmp_path / "p.log"
+    assert lh.write_text(p, "a\n") is True
+    assert lh.write_text(p, "b\n") is True
+    assert synced == []
+
+    (tmp_path / "gone.log").write_text("x")
+    syncer.mark(tmp_path / "gone.log")
+    (tmp_path / "gone.log").unlink()
+    syncer.sync_now()
+    assert len(synced) == 1
+    syncer.sync_now()
+    assert len(synced) == 1
+
+
+def test_batch_writer_wakes_on_size_and_flush_all(tmp_path, monkeypatch):
+    """Pendências acima de _ASYNC_MAX_CHARS acordam o flusher; flush_all grava tudo."""
+    import src.system.log_helpers as lh
+
+    w = lh._BatchWriter(interval=60)
+    monkeypatch.setattr(w, "_thread", object())  # sem thread de fundo no teste
+    monkeypatch.setattr(lh, "_ASYNC_MAX_CHARS", 8)
+    monkeypatch.setattr(lh, "_BATCH_WRITER", w)
+    p = tmp_path / "s.log"
+    w.submit(p, "abc\n")
+    assert not w._wake.is_set()
+    w.submit(p, "defgh\n")
+    assert w._wake.is_set()
+    lh.flush_all()
+    assert p.read_text(encoding="utf-8") == "abc\ndefgh\n"
+
+
+def test_rotation_uses_zstd_when_enabled(tmp_path, monkeypatch):
+    """Com ZSTD_ARCHIVES a rotação gera `.zst` no lugar de `.gz`."""
+    import src.system.log_helpers as lh
+
+    calls = []
+    monkeypatch.setattr(lh, "ZSTD_ARCHIVES", True)
+    monkeypatch.setattr(lh, "compress_file_zstd", lambda s, d: calls.append(d) or True)
+    rotating = tmp_path / ("app.log" + lh.ROTATING_SUFFIX)
+    rotating.write_text("x\n")
+    os.utime(rotating, (0, 0))
+    lh.try_compress_rotating(rotating, tmp_path, 1, 1)
+    assert calls == [tmp_path / "app.log.zst"]
+    assert not rotating.exists()
+
+
+def test_compress_file_zstd_roundtrip(tmp_path):
+    """compress_file_zstd gera um .zst legível por iter_jsonl."""
+    import pytest
+
+    pytest.importorskip("zstandard")
+    import src.system.log_helpers as lh
+    from src.system.ingest import iter_jsonl
+
+    src = tmp_path / "a.jsonl"
+    src.write_text('{"a": 1}\n{"b": 2}\n', encoding="utf-8")
+    dst = tmp_path / "a.jsonl.zst"
+    assert lh.compress_file_zstd(src, dst) is True
+    assert list(iter_jsonl(dst, max_retries=0)) == [{"a": 1}, {"b": 2}]
+
+
+def test_atomic_move_fsyncs_destination_dir(tmp_path, monkeypatch):
+    """Após mover, o diretório de destino é sincronizado (exceto no modo never)."""
+    import src.system.log_helpers as lh
+
+    real_fsync_dir = lh._fsync_dir
+    dirs = []
+    monkeypatch.setattr(lh, "_fsync_dir", lambda d: dirs.append(d))
+    monkeypatch.setattr(lh, "SYNC_MODE", "periodic")
+    (tmp_path / "a.log").write_text("x")
+    (tmp_path / "arch").mkdir()
+    assert lh.atomic_move_to_archive(tmp_path / "a.log", tmp_path / "arch" / "a.log.rotating") is True
+    assert dirs == [tmp_path / "arch"]
+
+    monkeypatch.setattr(lh, "SYNC_MODE", "never")
+    (tmp_path / "b.log").write_text("y")
+    assert lh.atomic_move_to_archive(tmp_path / "b.log", tmp_path / "arch" / "b.log.rotating") is True
+    assert dirs == [tmp_path / "arch"]
+    real_fsync_dir(tmp_path / "arch")  # implementação real: não levanta
+    real_fsync_dir(tmp_path / "inexistente")
+
+
+def test_run_rotation_jobs_isolates_failures(monkeypatch):
+    """Uma tarefa com erro não impede as demais; várias tarefas usam o pool."""
+    import threading
+
+    import src.system.log_helpers as lh
+
+    monkeypatch.setattr(lh, "_ROTATION_WORKERS", 4)
+    done = []
+    threads = set()
+
+    def ok(i):
+        threads.add(threading.current_thread().name)
+        done.append(i)
+
+    def boom():
+        raise RuntimeError("falhou")
+
+    lh.run_rotation_jobs([lambda: ok(1), boom, lambda: ok(2), lambda: ok(3)])
+    assert sorted(done) == [1, 2, 3]
+    assert all(name.startswith("rotate") for name in threads)
+
+    done.clear()
+    lh.run_rotation_jobs([lambda: ok(9)])
+    assert done == [9]
+
+
+def test_ensure_dir_writable_caches_probe(tmp_path, monkeypatch):
+    """A sonda roda uma vez por diretório; diretório removido é recriado."""
+    import src.system.log_helpers as lh
+
+    d = tmp_path / "cached"
+    assert lh.ensure_dir_writable(d) is True
+    probes = []
+    real_mkdir = lh.Path.mkdir
+    monkeypatch.setattr(lh.Path, "mkdir", lambda self, *a, **k: probes.append(self) or real_mkdir(self, *a, **k))
+    assert lh.ensure_dir_writable(d) is True
+    assert probes == []
+
+    d.rmdir()
+    assert lh.ensure_dir_writable(d) is True
+    assert d.is_dir()
+    assert probes == [d]
+
+
+def test_write_text_recreates_removed_parent(tmp_path, monkeypatch):
+    """Diretório removido após o cache: a escrita recria-o e repete uma vez."""
+    import shutil
+
+    import src.system.log_helpers as lh
+
+    monkeypatch.setattr(lh, "ASYNC_WRITES", False)
+    monkeypatch.setattr(lh, "DURABLE_WRITES", False)
+    p = tmp_path / "sub" / "a.log"
+    assert lh._write_text_now(p, "1\n") is True
+    assert os.fspath(p.parent) in lh._KNOWN_DIRS
+
+    shutil.rmtree(p.parent)
+    assert lh._write_text_now(p, "2\n") is True
+    assert p.read_text() == "2\n"
+
+
+def test_write_text_fd_cache_reuses_and_invalidates(tmp_path, monkeypatch):
+    """Com FD_CACHE o descritor é reaproveitado e a rotação o invalida."""
+    import src.system.log_helpers as lh
+
+    monkeypatch.setattr(lh, "FD_CACHE", True)
+    monkeypatch.setattr(lh, "FILE_LOCK", False)
+    monkeypatch.setattr(lh, "ASYNC_WRITES", False)
+    monkeypatch.setattr(lh, "DURABLE_WRITES", False)
+    monkeypatch.setattr(lh, "_FD_CACHE", lh._FdCache(60.0))
+    p = tmp_path / "fd.log"
+    assert lh.write_text(p, "a\n") is True
+    fd = lh._FD_CACHE.get(p)
+    assert lh.write_text(p, "b\n") is True
+    assert lh._FD_CACHE.get(p) == fd
+    assert p.read_text() == "a\nb\n"
+
+    assert lh.atomic_move_to_archive(p, tmp_path / "fd.log.rotating") is True
+    assert lh.write_text(p, "c\n") is True
+    assert p.read_text() == "c\n"
+    assert (tmp_path / "fd.log.rotating").read_text() == "a\nb\n"
+    lh._FD_CACHE.close()
+
+
+def test_write_json_lines_single_write(tmp_path, monkeypatch):
+    """write_json_lines grava o lote inteiro com uma única chamada a write_text."""
+    import src.system.log_helpers as lh
+
+    writes = []
+    real_write_text = lh.write_text
+    monkeypatch.setattr(lh, "write_text", lambda p, t: writes.append(t) or real_write_text(p, t))
+    p = tmp_path / "batch.jsonl"
+    assert lh.write_json_lines(p, [{"a": 1}, {"b": 2}]) is True
+    assert len(writes) == 1
+    assert [lh.json_loads(line) for line in p.read_text().splitlines()] == [{"a": 1}, {"b": 2}]
+    assert lh.write_json_lines(p, []) is False
+
+
+def test_iso_utc_now_matches_datetime_format():
+    """iso_utc_now produz ISO-8601 UTC compatível com datetime.fromisoformat."""
+    from datetime import timezone
+
+    import src.system.log_helpers as lh
+
+    ts = lh.iso_utc_now()
+    parsed = datetime.fromisoformat(ts)
+    assert parsed.tzinfo == timezone.utc
+    assert abs(parsed.timestamp() - time.time()) < 5
+    assert len(ts) == len("2024-01-01T00:00:00.000000+00:00")
+
+
+def test_write_json_passes_utf8_bytes(tmp_path, monkeypatch):
+    """Linhas JSON seguem como bytes UTF-8; filas de lote recebem texto."""
+    import src.system.log_helpers as lh
+
+    monkeypatch.setattr(lh, "ASYNC_WRITES", False)
+    monkeypatch.setattr(lh, "DURABLE_WRITES", False)
+    p = tmp_path / "b.jsonl"
+    assert lh.write_json(p, {"msg": "ação"}) is True
+    assert lh.json_loads(p.read_bytes()) == {"msg": "ação"}
+
+    queued = []
+    monkeypatch.setattr(lh, "DURABLE_WRITES", True)
+    monkeypatch.setattr(lh._COMMITTER, "commit", lambda path, text: queued.append(text) or True)
+    assert lh.write_json(p, {"a": 1}) is True
+    assert isinstance(queued[0], str)
+
+
+def test_fd_cache_releases_on_date_change(tmp_path):
+    """Na virada do dia os descritores em cache são fechados."""
+    from datetime import timedelta
+
+    import pytest
+
+    import src.system.log_helpers as lh
+
+    cache = lh._FdCache(60.0)
+    p = tmp_path / "day.log"
+    fd = cache.get(p)
+    cache.release_on_date_change()
+    assert cache.get(p) == fd
+
+    cache._day = cache._day - timedelta(days=1)
+    cache.release_on_date_change()
+    assert os.fspath(p) not in cache._fds
+    with pytest.raises(OSError):
+        os.fstat(fd)
+    cache.close()
+
+
+def test_fd_cache_close_waits_for_path_lock(tmp_path):
+    """Um descritor em uso (lock do caminho detido) não é fechado por outra thread."""
+    import threading
+
+    import src.system.log_helpers as lh
+
+    cache = lh._FdCache(60.0)
+    p = tmp_path / "busy.log"
+    fd = cache.get(p)
+    with lh._path_lock(p):
+        closer = threading.Thread(target=cache.invalidate, args=(p,))
+        closer.start()
+        closer.join(0.1)
+        assert closer.is_alive()
+        os.fstat(fd)  # ainda aberto enquanto o "writer" detém o lock
+    closer.join(1)
+    assert not closer.is_alive()
+    assert os.fspath(p) not in cache._fds
+    cache.close()
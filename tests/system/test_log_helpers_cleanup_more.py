@@ -16,7 +16,6 @@ def test_atomic_move_cleanup_when_dst_exists(tmp_path, monkeypatch):
     dst.write_text("old")
 
     # make attempts fail
-    monkeypatch.setattr(lh, "_attempt_rename", lambda a, b: False)
     monkeypatch.setattr(lh, "_attempt_replace", lambda a, b: False)
     monkeypatch.setattr(lh, "_copy_replace_fallback", lambda a, b: False)
 
@@ -186,14 +185,14 @@ def test_ensure_dir_writable_permission_error(tmp_path, monkeypatch):
     assert res is False
 
 
-def test_atomic_move_rename_short_circuit(tmp_path, monkeypatch):
-    """Teste para atalho de renomeação em movimentação atômica."""
+def test_atomic_move_replace_short_circuit(tmp_path, monkeypatch):
+    """Teste para atalho do os.replace em movimentação atômica."""
     s = tmp_path / "s2.txt"
     s.write_text("ok")
     dst = tmp_path / "archive" / (s.name + lh.ROTATING_SUFFIX)
     dst.parent.mkdir()
 
-    monkeypatch.setattr(lh, "_attempt_rename", lambda a, b: True)
+    monkeypatch.setattr(lh, "_attempt_replace", lambda a, b: True)
 
     res = lh.atomic_move_to_archive(s, dst)
     assert res is True
@@ -207,7 +206,7 @@ def test_try_rotate_file_no_action_if_not_old(tmp_path, monkeypatch):
     archive.mkdir()
 
     # Ensure is_older_than returns False so function returns early
-    monkeypatch.setattr(lh, "is_older_than", lambda path, secs: False)
+    monkeypatch.setattr(lh, "is_older_than", lambda path, secs, **kw: False)
 
     # If atomic_move_to_archive is called it indicates a bug; ensure it's not called
     def fail_if_called(*a, **kw):
@@ -14,7 +14,6 @@ def test_atomic_move_backoff_and_cleanup(tmp_path, monkeypatch):
     dst = archive / (s.name + lh.ROTATING_SUFFIX)
 
     # Make all low-level operations raise
-    monkeypatch.setattr(lh, "_attempt_rename", lambda a, b: False)
     monkeypatch.setattr(lh, "_attempt_replace", lambda a, b: False)
     monkeypatch.setattr(lh, "_copy_replace_fallback", lambda a, b: False)
 
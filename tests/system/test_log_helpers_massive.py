@@ -55,7 +55,6 @@ def test_attempts_failures(tmp_path, monkeypatch):
     d = tmp_path / "d.txt"
 
     # force rename and replace to fail
-    monkeypatch.setattr(lh, "_attempt_rename", lambda a, b: False)
     monkeypatch.setattr(lh, "_attempt_replace", lambda a, b: False)
 
     # patch shutil.copy2 to raise
@@ -72,7 +71,7 @@ def test_all_children_old_oserror(tmp_path, monkeypatch):
     d = tmp_path / "d"
     d.mkdir()
 
-    monkeypatch.setattr(Path, "iterdir", lambda self: (_ for _ in ()).throw(OSError("boom")))
+    monkeypatch.setattr(lh.os, "scandir", lambda p: (_ for _ in ()).throw(OSError("boom")))
     assert lh.all_children_old(d, 1) is False
 
 
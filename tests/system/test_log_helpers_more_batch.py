@@ -82,3 +82,16 @@ def test_attempt_replace_and_copy_fallback(tmp_path, monkeypatch):
     res = lh._copy_replace_fallback(s, d)
     # copy fallback should either succeed or return False but not raise
     assert isinstance(res, bool)
+
+
+def test_is_older_than_and_all_children_old_with_now_ts(tmp_path):
+    """now_ts fixa o instante de referência de toda a varredura."""
+    d = tmp_path / "d2"
+    d.mkdir()
+    c = d / "c"
+    c.write_text("y")
+    os.utime(c, (1000, 1000))
+    assert lh.is_older_than(c, 10, now_ts=1005) is False
+    assert lh.is_older_than(c, 10, now_ts=1010) is True
+    assert lh.all_children_old(d, 10, now_ts=1005) is False
+    assert lh.all_children_old(d, 10, now_ts=2000) is True
@@ -32,7 +32,7 @@ def test_write_text_fsync_failure(monkeypatch, tmp_path):
     def raise_oserror(*args, **kwargs):
         raise OSError("fsync fail")
 
-    monkeypatch.setattr(lh.os, "fsync", raise_oserror)
+    monkeypatch.setattr(lh, "_fsync", raise_oserror)
     # no exception should be raised
     lh.write_text(p, "x\n")
     assert p.exists()
@@ -67,3 +67,41 @@ def test_build_human_line_multiline_env(monkeypatch):
     monkeypatch.setenv("MONITORING_HUMAN_MULTILINE", "1")
     s = lh.build_human_line("ts", "INFO", "line1\nline2", {"a": 1})
     assert "\n" in s
+
+
+def test_write_text_skips_portalocker_when_file_lock_disabled(monkeypatch, tmp_path):
+    """Com FILE_LOCK desligado, write_text não chama portalocker."""
+
+    class FailPL:
+        LOCK_EX = 1
+
+        @staticmethod
+        def lock(fh, mode):
+            raise AssertionError("lock não deveria ser chamado")
+
+    monkeypatch.setattr(lh, "portalocker", FailPL, raising=False)
+    monkeypatch.setattr(lh, "FILE_LOCK", False)
+    monkeypatch.setattr(lh, "ASYNC_WRITES", False)
+    p = tmp_path / "nolock.txt"
+    assert lh.write_text(p, "a\n") is True
+    assert lh.JsonlAppender().append(p, "b\n") is True
+    assert p.read_text() == "a\nb\n"
+
+
+def test_write_text_threads_share_path_lock(monkeypatch, tmp_path):
+    """Sem portalocker, threads no mesmo ficheiro usam o lock por caminho."""
+    import threading
+
+    monkeypatch.setattr(lh, "FILE_LOCK", False)
+    monkeypatch.setattr(lh, "ASYNC_WRITES", False)
+    monkeypatch.setattr(lh, "DURABLE_WRITES", False)
+    p = tmp_path / "threads.txt"
+    assert lh._path_lock(p) is lh._path_lock(tmp_path / "threads.txt")
+
+    line = "x" * 200 + "\n"
+    workers = [threading.Thread(target=lambda: [lh.write_text(p, line) for _ in range(50)]) for _ in range(4)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    assert p.read_text().splitlines() == [line.strip()] * 200
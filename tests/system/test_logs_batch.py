@@ -41,29 +41,31 @@ def test_normalize_messages_and_extras():
 
 def test_write_log_human_and_json(tmp_path, monkeypatch):
     """Teste para escrita de log humano e JSON em lote."""
-    # direct writes captured by monkeypatching write_text and write_json
+    # direct writes captured by monkeypatching write_text and write_json_lines
     monkeypatch.setenv("MONITORING_LOG_ROOT", str(tmp_path))
     calls = {"text": [], "json": []}
 
     def fake_write_text(p, text):
         calls["text"].append((p, text))
 
-    def fake_write_json(p, obj):
-        calls["json"].append((p, obj))
+    def fake_write_json_lines(p, objs):
+        calls["json"].append((p, objs))
 
     monkeypatch.setattr(logs_mod, "write_text", fake_write_text)
-    monkeypatch.setattr(logs_mod, "write_json", fake_write_json)
+    monkeypatch.setattr(logs_mod, "write_json_lines", fake_write_json_lines)
 
     # single message
     logs_mod.write_log("app", "INFO", "hello", extra={"k": "v"}, human_enable=True, json_enable=True)
     assert calls["text"] or calls["json"]
 
-    # multiple messages with extras list
+    # multiple messages with extras list: uma escrita por destino
     calls["text"].clear()
     calls["json"].clear()
     logs_mod.write_log("app", "INFO", ["a", "b"], extra=[{"i": 1}, {"i": 2}], human_enable=True, json_enable=True)
-    assert len(calls["text"]) == 2
-    assert len(calls["json"]) == 2
+    assert len(calls["text"]) == 1
+    assert calls["text"][0][1].count("\n") == 2
+    assert len(calls["json"]) == 1
+    assert [o["i"] for o in calls["json"][0][1]] == [1, 2]
 
 
 def test_hourly_allows_write_and_perform_human(tmp_path, monkeypatch):
@@ -108,7 +110,7 @@ def test_rotate_logs_calls_try_rotate(monkeypatch, tmp_path):
 
     called = []
 
-    def fake_try_rotate(p, archive_dir, gz_suffix, day_secs, week_secs):
+    def fake_try_rotate(p, archive_dir, gz_suffix, day_secs, week_secs, **kw):
         called.append((p.name, gz_suffix))
 
     monkeypatch.setattr(logs_mod, "try_rotate_file", fake_try_rotate)
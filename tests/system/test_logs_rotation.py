@@ -37,7 +37,7 @@ def test_compress_old_logs_iterates_rotating(tmp_path, monkeypatch):
 
     called = {"count": 0}
 
-    def fake_try_compress_rotating(r, a, d, w):
+    def fake_try_compress_rotating(r, a, d, w, **kw):
         called["count"] += 1
 
     # compress_old_logs uses the local import in logs_mod, so patch that name
@@ -79,10 +79,57 @@ def test_rotate_logs_calls_try_rotate(tmp_path, monkeypatch):
 
     called = {"count": 0}
 
-    def fake_try_rotate_file(p, a, s, d, e):
+    def fake_try_rotate_file(p, a, s, d, e, **kw):
         # accept five args (p, archive_dir, gz_suffix, day_secs, week_secs)
         called["count"] += 1
 
     monkeypatch.setattr(logs_mod, "try_rotate_file", fake_try_rotate_file)
     logs_mod.rotate_logs(day_secs=1, week_secs=7)
     assert called["count"] >= 2
+
+
+def test_scan_files_filters_suffixes_and_passes_stat(tmp_path, monkeypatch):
+    """_scan_files lista só ficheiros visíveis com os sufixos pedidos; o stat é reaproveitado."""
+    for name in ("b.log.gz", "a.jsonl.gz", ".hidden.log.gz", "c.txt"):
+        (tmp_path / name).write_text("x")
+    (tmp_path / "dir.log.gz").mkdir()
+
+    found = logs_mod._scan_files(tmp_path, (".jsonl.gz", ".log.gz"))
+    assert [p.name for p, _st in found] == ["a.jsonl.gz", "b.log.gz"]
+    assert logs_mod._scan_files(tmp_path / "missing", (".log",)) == []
+
+    def no_stat(self, *a, **kw):
+        raise AssertionError("stat repetido")
+
+    monkeypatch.setattr(lh.Path, "stat", no_stat)
+    p, st = found[0]
+    assert lh.is_older_than(p, 10**9, st=st) is False
+
+
+def test_compress_in_flight_writes_gz_and_rotation_only_moves(tmp_path, monkeypatch):
+    """Com COMPRESS_IN_FLIGHT o .log nasce em gzip e a rotação só o move para archive."""
+    import gzip
+
+    monkeypatch.setenv("MONITORING_LOG_ROOT", str(tmp_path / "inflight"))
+    monkeypatch.setattr(lh, "COMPRESS_IN_FLIGHT", True)
+    monkeypatch.setattr(lh, "ASYNC_WRITES", False)
+    logs_mod.write_log("app", "INFO", ["um", "dois"], human_enable=True, json_enable=False)
+    lp = logs_mod.get_log_paths()
+    (gz,) = lp.log_dir.glob("app*.log.gz")
+    lines = gzip.decompress(gz.read_bytes()).decode("utf-8").splitlines()
+    assert len(lines) == 2 and lines[0].endswith("um") and lines[1].endswith("dois")
+
+    os.utime(gz, (0, 0))
+    monkeypatch.setattr(lh, "compress_file", lambda s, d: (_ for _ in ()).throw(AssertionError("recomprimiu")))
+    logs_mod.rotate_logs(day_secs=1, week_secs=7)
+    assert not gz.exists()
+    assert gzip.decompress((lp.archive_dir / gz.name).read_bytes()).decode("utf-8").splitlines() == lines
+
+
+def test_log_paths_carry_fspath_strings(tmp_path):
+    """LogPaths guarda os diretórios também como str (calculados uma vez)."""
+    lp = logs_mod.get_log_paths(tmp_path / "strs")
+    assert lp.log_dir_str == os.fspath(lp.log_dir)
+    assert lp.json_dir_str == os.fspath(lp.json_dir)
+    assert lp.archive_dir_str == os.fspath(lp.archive_dir)
+    assert list(lp) == [lp.root, lp.log_dir, lp.json_dir, lp.archive_dir]
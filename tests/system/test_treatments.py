@@ -64,3 +64,16 @@ def test_reapply_network_config_no_candidates(monkeypatch):
     monkeypatch.setattr("src.system.treatments._platform_candidates", lambda p: [])
     # ensure returns without exception
     reapply_network_config()
+
+
+def test_allowed_hour_is_cached(monkeypatch):
+    """A hora permitida só é reconvertida quando o env muda."""
+    from src.system import treatments
+
+    monkeypatch.setattr(treatments, "_allowed_hour_cache", (None, None))
+    monkeypatch.setenv("NETWORK_TREATMENT_ALLOWED_HOUR", "3")
+    assert treatments._allowed_hour() == 3
+    monkeypatch.setenv("NETWORK_TREATMENT_ALLOWED_HOUR", "x")
+    assert treatments._allowed_hour() is None
+    monkeypatch.delenv("NETWORK_TREATMENT_ALLOWED_HOUR")
+    assert treatments._allowed_hour() is None